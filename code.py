@@ -9,13 +9,15 @@ Version: 0.1.0
 Since: 0.1.0
 """
 
+import time
+from boottrace import BootTrace
+boot = BootTrace()
+
 import sys
 import os
 import gc
-import time
 import board
 
-import json
 import sdcardio
 import storage
 
@@ -24,18 +26,31 @@ from busio import I2C, SPI, UART
 from rotaryio import IncrementalEncoder
 
 from adafruit_neotrellis.neotrellis import NeoTrellis
+from pixelbuffer import PixelBuffer
 
 import menu
+from voicepool import VoicePool
+from scheduler import Scheduler
+from profiler import Profiler
 
-from audiocore import WaveFile
 import audiomixer
 from audiopwmio import PWMAudioOut
 
 from audiobusio import I2SOut
-import adafruit_midi
-from adafruit_midi.note_on import NoteOn
-from adafruit_midi.note_off import NoteOff
-from adafruit_midi.program_change import ProgramChange
+from midiin import MidiIn
+from samplecache import SampleCache
+from streampool import StreamPool
+from patchbundle import PatchBundle
+from sampletable import SampleTable
+from latency import LatencyHistogram
+from adafruit_ticks import ticks_ms, ticks_diff
+from heapbudget import HeapBudget, Estimate
+import heapbudget
+import velocitycurve
+import samplelayers
+import pitchvariants
+import configcache
+import patchindex
 
 # Program Constants
 
@@ -45,23 +60,55 @@ MAX_VOICES        = 8
 MIDI_CHANNEL      = 10
 MIDI_THRU         = False
 
+CC_ALL_SOUND_OFF  = 120
+CC_ALL_NOTES_OFF  = 123
+
 AUDIO_BUFFER_SIZE = 1024
 AUDIO_RATE        = 22050
 AUDIO_CHANNELS    = 2
 AUDIO_BITS        = 16
 AUDIO_OUTPUT      = "i2s" # "pwm" or "i2s"
 AUDIO_VOLUME      = 1.0
+AUDIO_CACHE_BYTES = 0 # RAM sample cache disabled
+AUDIO_CACHE_PIN   = 32768 # Cached samples this size or smaller are never evicted while in use
+AUDIO_VARIANTS    = 16 # Pitch variants kept open at once
+AUDIO_FLASH_BYTES = 512 # Buffer bytes of each stream from the internal flash
+AUDIO_SD_BYTES    = 1024 # Buffer bytes of each stream from the SD card, reads are slower to start
+AUDIO_STREAM_MIN  = 8 # WaveFile raises ValueError for buffers outside this range
+AUDIO_STREAM_MAX  = 1024
+AUDIO_VOICE_STEAL = "oldest" # "none", "oldest", "quietest" or "same"
 
 CONFIG            = "config.json"
 SD_MOUNT          = "/sd"
 SD_CONFIG         = "config.json"
 
+TASK_PERIODS      = {
+    "midi": 0.0, # As fast as possible
+    "trellis": 0.005,
+    "leds": 0.033,
+    "menu": 0.033,
+    "loader": 0.0, # One sample per pass while switching patches
+    "report": 0.0, # Disabled
+    "stats": 0.5, # Only while latency stats are enabled
+    "heap": 0.0, # Every pass while the memory monitor is enabled
+}
+
+STATS_LATENCY     = False
+PROFILE_ENABLED   = False
+PROFILE_WINDOW    = 5.0 # Seconds between profile summaries
+PROFILE_BUDGET    = 0.005 # Loop passes longer than this count as overruns
+MEMORY_RESERVE    = 16384 # Bytes of heap a patch load must leave free
+MEMORY_MONITOR    = False
+BOOT_FAST         = False # Skip the splash and animations, the menu is built once the default patch plays
+
 MAX_PAD           = 16
 PAD_VELOCITY      = 127
+TRELLIS_FPS       = 60 # Most pixel updates sent to the NeoTrellis per second
 
 DISPLAY_ADDRESS   = 0x3c
 DISPLAY_WIDTH     = 128
 DISPLAY_HEIGHT    = 64
+DISPLAY_FPS       = 30 # Most frames sent to the display per second
 
 # Color Constants
 
@@ -111,23 +158,10 @@ led.value = True
 # Initialize NeoTrellis I2C RGB 4x4 Button Pad
 trellis_i2c = I2C(scl=board.GP19, sda=board.GP18)
 trellis = NeoTrellis(trellis_i2c)
+trellis_frame = PixelBuffer(trellis, MAX_PAD, TRELLIS_FPS)
 trellis_buffer = [COLOR_OFF for i in range(MAX_PAD)]
-for i in range(MAX_PAD):
-    trellis.pixels[i] = trellis_buffer[i]
-    time.sleep(0.05)
-
-# Initialize Menu Display and Encoder
-menu.release_displays()
-display_i2c = I2C(scl=board.GP21, sda=board.GP20)
-display_menu = menu.Menu(
-    i2c=display_i2c,
-    encoder_pin_a=board.GP12,
-    encoder_pin_b=board.GP13,
-    button_pin=board.GP7,
-    address=DISPLAY_ADDRESS,
-    width=DISPLAY_WIDTH,
-    height=DISPLAY_HEIGHT
-)
+trellis_frame.fill(COLOR_OFF)
+trellis_frame.flush()
 
 # Initialize SFX Mod Encoder
 mod_encoder = IncrementalEncoder(board.GP26, board.GP27)
@@ -135,127 +169,574 @@ mod_button = DigitalInOut(board.GP28)
 mod_button.direction = Direction.INPUT
 mod_button.pull = Pull.UP
 
-# Initialization Screen
-display_menu.splash_image()
-display_menu.splash_message("Version 0.1.0")
-
-# Wait for USB to stabilize
-time.sleep(0.5)
-
 # Serial Header
 print("RPi Pico Drum Machine\nVersion 0.1.0\nCooper Dalrymple, 2022\nhttps://dcdalrymple.com/rpi-pico-drum/")
+boot.mark("hardware")
+
+# Menu Display and Encoder, built once the config is read
+display_menu = None
+def initDisplay():
+    global display_i2c, display_menu
+    menu.release_displays()
+    display_i2c = I2C(scl=board.GP21, sda=board.GP20)
+    display_menu = menu.Menu(
+        i2c=display_i2c,
+        encoder_pin_a=board.GP12,
+        encoder_pin_b=board.GP13,
+        button_pin=board.GP7,
+        address=DISPLAY_ADDRESS,
+        width=DISPLAY_WIDTH,
+        height=DISPLAY_HEIGHT,
+        refresh_fps=config.getDisplayFps()
+    )
 
-# Class Definitions
-
-class Sample:
-    def __init__(self, index, data = None):
-        self.index = index
+    # Initialization Screen
+    display_menu.splash_image()
+    display_menu.splash_message("Version 0.1.0")
 
-        self.note = 0
-        self.pad = -1
-        self.color = COLOR_DEFAULT
-        self.level = 1.0
-        self.minLevel = 0.0
-        self.pan = 0.0
-        self.loop = False
-        self.stopNoteOff = False
+def splash(message):
+    if display_menu != None:
+        display_menu.splash_message(message)
 
-        self.voice = -1
+# Class Definitions
 
-        if data != None:
-            self.load(data)
+class Source:
+    # A wave file shared by every layer and sample of a patch which plays it
+    def __init__(self, path, pin=None, cached=True, bundle=None):
+        self.path = path
+        self.pin = pin
+        self.cached = cached
+        self.bundle = bundle
+        self.owners = []
+        self.handles = 0
+        self.raw = None
+        self.streams = []
+        self.active = 0
+
+        # Pitch offset => variant source, None if its file is missing
+        self.variants = dict()
+        self.parent = None
+        self.offset = 0
+
+    def open(self, owner, handles):
+        # Samples add up to their voice count of streams, never more than the mixer can play
+        if owner in self.owners:
+            return bool(self.raw or self.streams)
+        self.owners.append(owner)
+        self.handles = min(MAX_VOICES, self.handles + handles)
+
+        # Files packed in the patch bundle are already in RAM
+        if self.bundle != None and self.raw == None:
+            self.raw = self.bundle.get(self.path)
+        if self.cached and self.raw == None and not self.streams:
+            self.raw = cache.load(self.path, self, self.pin)
+        if self.raw:
+            return True
+        return self.openStream()
+
+    def openStream(self):
+        # A wave can only be streamed by one voice at a time, one stream is opened up front to check the file
+        # and each voice takes another from the pool when it starts
+        if self.streams:
+            return True
+        try:
+            self.acquireStream()
+        except (OSError, ValueError):
+            return False
+        return True
 
-    def load(self, data):
-        if not "file" in data:
+    def acquireStream(self):
+        stream = getStreamPool(self.path).acquire(self, self.path)
+        if stream != None:
+            self.streams.append(stream)
+        return stream
+
+    def closeStream(self):
+        for stream in list(self.streams):
+            stream.pool.close(stream)
+        self.streams = []
+
+    def reclaimed(self, stream):
+        # The pool reopened one of our idle streams on another file
+        if stream in self.streams:
+            self.streams.remove(stream)
+
+    def close(self, owner):
+        # Returns True once the last owner is gone and the file is closed
+        if owner in self.owners:
+            self.owners.remove(owner)
+        if self.owners:
             return False
+        for variant in list(self.variants.values()):
+            if variant != None:
+                self.dropVariant(variant)
+        self.variants = dict()
+        if self.raw:
+            cache.release(self.path, self)
+            self.raw = None
+        self.closeStream()
+        return True
 
-        print("Loading Sample:", data["file"])
+    def stop(self):
+        for owner in self.owners:
+            owner.stop()
+
+    def evicted(self):
+        # Dropped from the RAM cache, fall back to streaming from storage
+        self.stop()
+        self.raw = None
+        if not self.openStream():
+            self.closeStream()
+
+    def getWave(self, voice):
+        # Cached samples can be played by any number of voices, streams use an idle one of ours, a new one from the pool or our oldest
+        if self.raw:
+            self.active += 1
+            return self.raw
+        stream = None
+        for item in self.streams:
+            if not item.is_playing():
+                stream = item
+                break
+        if stream == None and len(self.streams) < self.handles:
+            try:
+                stream = self.acquireStream()
+            except (OSError, ValueError):
+                return None
+        if stream == None:
+            for item in self.streams:
+                if stream == None or voices.get_started(item.voice) < voices.get_started(stream.voice):
+                    stream = item
+            if stream == None:
+                return None
+            voices.release(stream.voice)
+        stream.start(voice)
+        self.active += 1
+        return stream.wave
+
+    def releaseVoice(self, voice):
+        if self.active > 0:
+            self.active -= 1
+        for stream in self.streams:
+            if stream.voice == voice:
+                stream.stop()
+
+    def getVariant(self, offset):
+        # Pitched copies rendered by host/variants.py, opened the first time each one is played
+        if not offset in self.variants:
+            self.openVariant(offset)
+        variant = self.variants[offset]
+        if variant == None:
+            return self
+        if pitch_variants[-1] != variant:
+            pitch_variants.remove(variant)
+            pitch_variants.append(variant)
+        return variant
+
+    def openVariant(self, offset):
+        path = pitchvariants.get_path(self.path, offset)
+        variant = None
+        try:
+            if self.bundle == None or not self.bundle.has(path):
+                os.stat(path)
+            variant = Source(path, self.pin, self.cached, self.bundle)
+        except OSError:
+            print("Missing Pitch Variant:", path)
+        if variant != None:
+            closeVariants(config.getAudioVariants() - 1)
+            variant.parent = self
+            variant.offset = offset
+            if variant.open(self, self.handles):
+                pitch_variants.append(variant)
+            else:
+                variant.close(self)
+                variant = None
+        self.variants[offset] = variant
+
+    def dropVariant(self, variant):
+        if self.variants.get(variant.offset) == variant:
+            del self.variants[variant.offset]
+        if variant in pitch_variants:
+            pitch_variants.remove(variant)
+        variant.close(self)
+
+# Open pitch variants, least recently played first
+pitch_variants = []
+def closeVariants(limit):
+    # Variants which aren't sounding are closed until no more than the limit are open
+    i = 0
+    while len(pitch_variants) > limit and i < len(pitch_variants):
+        if pitch_variants[i].active:
+            i += 1
+        else:
+            pitch_variants[i].parent.dropVariant(pitch_variants[i])
 
-        if hasattr(self, "wave"):
-            self.unload()
+class Sample:
+    # Handle onto a row of the patch's sample table, only the files of the sample are kept here
+    def __init__(self, patch):
+        self.index = -1
+        self.patch = patch
+        self.table = patch.table
+
+        # Velocity => layer, each layer is a tuple of sources played round robin
+        self.layers = []
+        self.layerTable = None
+        self.rounds = None
+        self.sources = []
 
-        self.data = data
-        self.note = data["note"] if "note" in data else 0
-        self.pad = data["pad"] if "pad" in data else -1
-        self.color = getColor(data["color"]) if "color" in data else COLOR_DEFAULT
-        self.level = data["level"] if "level" in data else 1.0
-        self.minLevel = data["minLevel"] if "minLevel" in data else 0.0
-        self.pan = data["pan"] if "pad" in data else 0.0
-        self.loop = data["loop"] if "loop" in data else False
-        self.stopNoteOff = data["noteOff"] if "noteOff" in data else False
-
-        self.file = open(data["file"], "rb");
-        self.wave = WaveFile(self.file)
-        if self.wave == False:
-            self.unload()
+    def load(self, data):
+        layers = samplelayers.get_layers(data)
+        if layers:
+            print("Loading Sample:", ", ".join(samplelayers.get_all_files(data)))
+
+        low, high, root = pitchvariants.get_range(data)
+        self.index = self.table.add(
+            low,
+            high,
+            root,
+            pad=data["pad"] if "pad" in data else -1,
+            color=getColor(data["color"]) if "color" in data else COLOR_DEFAULT,
+            level=data["level"] if "level" in data else 1.0,
+            min_level=data["minLevel"] if "minLevel" in data else 0.0,
+            curve=data["velocityCurve"] if "velocityCurve" in data and velocitycurve.is_valid(data["velocityCurve"]) else velocitycurve.CURVE_LINEAR,
+            volume=config.getAudioVolume(),
+            pan=data["pan"] if "pan" in data else 0.0,
+            loop=data["loop"] if "loop" in data else False,
+            note_off=data["noteOff"] if "noteOff" in data else False,
+            max_voices=max(1, min(MAX_VOICES, data["maxVoices"])) if "maxVoices" in data else 1
+        )
+        if not layers:
             return False
 
+        pin = data["pin"] if "pin" in data else None
+        for low, high, files in layers:
+            layer = []
+            for path in files:
+                source = self.getSource(path, pin)
+                if not source in self.sources:
+                    self.sources.append(source)
+                if not source.open(self, self.table.max_voices[self.index]):
+                    self.unload()
+                    return False
+                layer.append(source)
+            self.layers.append(tuple(layer))
+        self.layerTable = samplelayers.build_table(layers) if len(layers) > 1 else samplelayers.SINGLE_LAYER
+        self.rounds = bytearray(len(self.layers))
+
         return True
 
-    def noteOn(self, velocity=1.0):
-        if not self.wave:
+    def getSource(self, path, pin=None):
+        # Files are opened once per patch no matter how many layers or samples use them
+        if not path in self.patch.sources:
+            self.patch.sources[path] = Source(path, pin, not self.patch.streamOnly, self.patch.bundle)
+        return self.patch.sources[path]
+
+    def getHandleCount(self):
+        # Streams this sample would need if every file and voice had its own
+        count = 0
+        for layer in self.layers:
+            for source in layer:
+                if not source.raw:
+                    count += self.table.max_voices[self.index]
+        return count
+
+    def getColor(self):
+        return self.table.get_color(self.index)
+    def getDimColor(self):
+        return self.table.get_dim_color(self.index)
+    def getVoice(self):
+        return self.table.voice[self.index]
+
+    def noteOn(self, velocity=PAD_VELOCITY, note=-1):
+        if not self.layers:
             return False
-        if velocity <= 0.0:
-            self.noteOff()
-        else:
-            self.stop()
-            for i in range(MAX_VOICES):
-                if mixer.voice[i].playing:
-                    continue
-                self.voice = i
-                mixer.voice[i].play(self.wave, loop=self.loop)
-                mixer.voice[i].level = min(1.0, max(0.0, velocity * (self.level - self.minLevel) + self.minLevel) * config.getAudioVolume())
-                mixer.voice[i].pan = max(-1.0, min(1.0, self.pan))
-                return True
-        return False
+        if velocity <= 0:
+            return self.noteOff()
+
+        table = self.table
+        index = self.index
+        layer = self.layerTable[velocity]
+        sources = self.layers[layer]
+        source = sources[self.rounds[layer]]
+        self.rounds[layer] = (self.rounds[layer] + 1) % len(sources)
+        if note >= 0 and note != table.root[index]:
+            source = source.getVariant(note - table.root[index])
+
+        # Retrigger over ourselves, cutting our oldest voice once all of ours are busy
+        if self.getVoiceCount() >= table.max_voices[index]:
+            voices.release(self.getOldestVoice())
+
+        i = voices.allocate(self)
+        if i < 0:
+            return False
+        wave = source.getWave(i)
+        if wave == None:
+            voices.release(i)
+            return False
+        if source.raw:
+            cache.touch(source.path)
+        self.patch.voices[i] = self
+        self.patch.playing[i] = source
+        table.voice[index] = i
+        mixer.voice[i].play(wave, loop=table.is_loop(index))
+        mixer.voice[i].level = table.get_level(index, velocity)
+        mixer.voice[i].pan = table.pan[index]
+        return True
 
     def noteOff(self):
-        if self.stopNoteOff:
+        if self.table.is_note_off(self.index):
             return self.stop()
         return True
 
     def stop(self):
-        if self.voice < 0:
+        if self.index < 0 or self.table.voice[self.index] < 0:
             return False
-        if mixer.voice[self.voice].playing:
-            mixer.voice[self.voice].stop()
-        mixer.voice[self.voice].level = 0.0
-        mixer.voice[self.voice].pan = 0.0
-        self.voice = -1
+        for i in range(MAX_VOICES):
+            if self.patch.voices[i] == self:
+                voices.release(i)
         return True
 
+    def update(self):
+        # Reclaim voices which have finished playing, returns True while any are still active
+        playing = False
+        for i in range(MAX_VOICES):
+            if self.patch.voices[i] != self:
+                continue
+            if mixer.voice[i].playing:
+                playing = True
+            else:
+                voices.release(i)
+        return playing
+
+    def releaseVoice(self, voice):
+        owner = self.patch
+        if owner.voices[voice] == self:
+            owner.voices[voice] = None
+            if owner.playing[voice] != None:
+                owner.playing[voice].releaseVoice(voice)
+                owner.playing[voice] = None
+        if self.table.voice[self.index] == voice:
+            latest = -1
+            for i in range(MAX_VOICES):
+                if owner.voices[i] == self and (latest < 0 or voices.get_started(i) > voices.get_started(latest)):
+                    latest = i
+            self.table.voice[self.index] = latest
+
+            # Stolen, cut off or stopped voices never reach leds_task, which skips silent pads
+            pad = self.table.pad[self.index]
+            if latest < 0 and pad >= 0 and owner == patch and owner.pads[pad] == self:
+                setTrellisBuffer(pad, self.getDimColor())
+
+    # Voices of the patch which are playing this sample
+    def getVoiceCount(self):
+        count = 0
+        for i in range(MAX_VOICES):
+            if self.patch.voices[i] == self:
+                count += 1
+        return count
+    def getOldestVoice(self):
+        voice = -1
+        for i in range(MAX_VOICES):
+            if self.patch.voices[i] == self and (voice < 0 or voices.get_started(i) < voices.get_started(voice)):
+                voice = i
+        return voice
+
     def unload(self):
-        self.noteOff()
-        if self.wave:
-            self.wave.deinit()
-            del self.wave
-        if self.file:
-            self.file.close()
-            del self.file
-        if self.data:
-            del self.data
-        gc.collect()
+        self.stop()
+        for source in self.sources:
+            if source.close(self) and self.patch.sources.get(source.path) == source:
+                del self.patch.sources[source.path]
+        self.sources = []
+        self.layers = []
+        self.layerTable = None
+        self.rounds = None
 
 class Patch:
     def __init__(self):
-        pass
+        self.name = ""
+        self.table = None
+        self.clearIndex()
 
     def load(self, data):
-        if not "samples" in data:
+        if not self.begin(data):
+            return False
+        while not self.step():
+            pass
+        if self.failed:
+            self.unload()
+            return False
+        self.show()
+        return True
+
+    # Incremental loading, one sample per step so the current patch can keep playing
+    def begin(self, data):
+        if not data or not "samples" in data:
             return False
 
         if hasattr(self, "data") or hasattr(self, "samples"):
             self.unload()
         self.data = data
+        self.name = data["name"] if "name" in data else ""
 
         self.samples = []
-        for i in range(min(MAX_SAMPLES, len(self.data["samples"]))):
-            self.samples.append(Sample(i, self.data["samples"][i]))
+        self.count = min(MAX_SAMPLES, len(self.data["samples"]))
+        self.table = SampleTable(self.count)
+        self.failed = False
+        self.streamOnly = False
+        self.memory = gc.mem_alloc()
+
+        # A bundle holds every file of the patch, its index is read in one step instead of a header per file
+        self.bundle = None
+        self.bundlePath = self.data["bundle"] if "bundle" in self.data else None
+        self.estimate = Estimate(self.count)
+        self.files = []
+        self.checked = 0
+        self.planned = False
+        if self.bundlePath == None:
+            self.addFiles()
+        return True
 
+    def addFiles(self):
+        # Every file is checked before anything is loaded, one header per step
+        for i in range(self.count):
+            for path in samplelayers.get_all_files(self.data["samples"][i]):
+                if not path in self.files:
+                    self.files.append(path)
+
+    def unbundle(self):
+        # Fall back to the files of each sample
+        self.bundlePath = None
+        self.estimate = Estimate(self.count)
+        self.files = []
+        self.checked = 0
+        self.planned = False
+        self.addFiles()
+
+    def step(self):
+        if self.failed:
+            return True
+        if not self.planned:
+            if self.bundlePath != None and not self.checked:
+                self.checked = 1
+                if not self.estimate.add_bundle(self.bundlePath):
+                    print("Missing Bundle:", self.bundlePath)
+                    self.unbundle()
+                return False
+            if self.checked < len(self.files):
+                self.estimate.add_file(self.files[self.checked], cache)
+                self.checked += 1
+                return False
+            self.planned = True
+            if not self.plan():
+                self.failed = True
+                return True
+            return False
+        if self.bundlePath != None and self.bundle == None:
+            try:
+                self.bundle = PatchBundle(self.bundlePath, SD_MOUNT + "/" if self.bundlePath.startswith(SD_MOUNT + "/") else "")
+            except (OSError, ValueError, MemoryError):
+                print("Invalid Bundle:", self.bundlePath)
+                self.bundle = None
+                self.unbundle()
+            return False
+        if not self.isLoading():
+            return True
+
+        i = len(self.samples)
+        sample = Sample(self)
+        try:
+            sample.load(self.data["samples"][i])
+        except MemoryError:
+            # Stop rather than leave a half loaded kit, the current patch keeps playing
+            sample.unload()
+            self.failed = True
+            print("Out of Memory: sample {} of {}, {} bytes free".format(i + 1, self.count, heap.collect()))
+            return True
+        self.samples.append(sample)
+        self.addIndex(sample)
+
+        if self.isLoading():
+            return False
+
+        # Everything needed to play is in the table and sources now, the config of the patch can go
+        memory = gc.mem_alloc()
+        del self.data
+        self.files = []
+        if config.getMemoryMonitor():
+            # Only collected to measure what the patch costs while memory use is being watched
+            gc.collect()
+            allocated = gc.mem_alloc()
+            print("Sample Table: {}, {} bytes of config freed".format(self.table.get_summary(), memory - allocated))
+            print(self.getMemoryReport(allocated))
+        else:
+            print("Sample Table:", self.table.get_summary())
+            print(self.getMemoryReport())
+        if self.bundle != None:
+            print("Bundle:", self.bundle.get_summary())
+        printStreams()
+        if cache.is_enabled():
+            print("Cached: {} samples, {}/{} bytes".format(cache.get_count(), cache.get_used(), cache.get_budget()))
+        return True
+
+    def isLoading(self):
+        return hasattr(self, "samples") and not self.failed and len(self.samples) < self.count
+
+    def plan(self):
+        # Streaming every sample instead of caching it is tried before giving up on the patch
+        result = heap.plan(self.estimate, cache)
+        print("Estimate: {} samples, {} files, {} bytes + {} cached, {} bytes free".format(
+            self.estimate.samples,
+            self.estimate.files,
+            self.estimate.get_fixed(),
+            self.estimate.get_cache(cache),
+            heap.get_free()
+        ))
+        if self.estimate.missing:
+            print("Missing Files:", self.estimate.missing)
+        if self.bundlePath != None and result != heapbudget.LOAD_FULL:
+            print("Over Budget: loading files instead of bundle")
+            self.unbundle()
+        elif result == heapbudget.LOAD_STREAM:
+            print("Over Budget: streaming every sample")
+            self.streamOnly = True
+        elif result == heapbudget.LOAD_REFUSE:
+            print("Over Budget: patch not loaded")
+            return False
+        return True
+
+    def getName(self):
+        return self.name
+
+    def getMemoryReport(self, allocated=None):
+        # What the samples cost once loaded, bytes from a reading taken after collecting, unpooled counts one stream per file reference and voice
+        layers = 0
+        streams = 0
+        unpooled = 0
+        for sample in self.samples:
+            layers += len(sample.layers)
+            unpooled += sample.getHandleCount()
+        for source in self.sources.values():
+            streams += len(source.streams)
+        report = "Layers: {} samples, {} layers, {} files, {} open streams ({} unpooled)".format(
+            len(self.samples),
+            layers,
+            len(self.sources),
+            streams,
+            unpooled
+        )
+        if allocated != None:
+            report += ", {} bytes".format(allocated - self.memory)
+        return report
+
+    def updateLevels(self):
+        if self.table != None:
+            self.table.update_levels(config.getAudioVolume())
+
+    def show(self):
         for i in range(MAX_PAD):
             sample = self.getPad(i)
             if sample:
-                setTrellisBuffer(i, tuple(int(c/2) for c in sample.color), True)
+                setTrellisBuffer(i, sample.getDimColor(), True)
             else:
                 setTrellisBuffer(i, COLOR_OFF, True)
 
@@ -266,12 +747,34 @@ class Patch:
             del self.samples
         if hasattr(self, "data") and self.data:
             del self.data
-        gc.collect()
+        self.table = None
+        if hasattr(self, "bundle") and self.bundle != None:
+            self.bundle.deinit()
+            self.bundle = None
+        self.clearIndex()
+        heap.collect()
+
+    # Lookup tables: note => samples, pad => sample, voice => sample & source playing it, file => source
+    def clearIndex(self):
+        self.sources = dict()
+        self.notes = dict()
+        self.pads = [None for i in range(MAX_PAD)]
+        self.voices = [None for i in range(MAX_VOICES)]
+        self.playing = [None for i in range(MAX_VOICES)]
+    def addIndex(self, sample):
+        for note in range(self.table.low[sample.index], self.table.high[sample.index] + 1):
+            if note in self.notes:
+                self.notes[note].append(sample)
+            else:
+                self.notes[note] = [sample]
+        pad = self.table.pad[sample.index]
+        if pad >= 0 and pad < MAX_PAD and self.pads[pad] == None:
+            self.pads[pad] = sample
 
     def noteOn(self, note, velocity):
         sample = self.getNote(note)
         if sample:
-            return sample.noteOn(velocity)
+            return sample.noteOn(velocity, note)
         return False
     def noteOff(self, note):
         sample = self.getNote(note)
@@ -279,11 +782,14 @@ class Patch:
             return sample.noteOff()
         return False
     def getNote(self, note):
-        if not hasattr(self, "data") or not self.data or not self.data["samples"]:
+        if not note in self.notes:
             return False
-        for i in range(min(MAX_SAMPLES, len(self.data["samples"]))):
-            if self.samples[i].note == note:
-                return self.samples[i]
+        return self.notes[note][0]
+
+    def controlChange(self, control, value):
+        if control == CC_ALL_SOUND_OFF or control == CC_ALL_NOTES_OFF:
+            voices.release_all()
+            return True
         return False
 
     def padOn(self, pad, velocity=PAD_VELOCITY):
@@ -297,24 +803,24 @@ class Patch:
             return sample.noteOff()
         return False
     def getPad(self, pad):
-        if not hasattr(self, "data") or not self.data or not self.data["samples"]:
+        if pad < 0 or pad >= MAX_PAD or self.pads[pad] == None:
             return False
-        for i in range(len(self.data["samples"])):
-            if self.samples[i].pad == pad:
-                return self.samples[i]
-        return False
+        return self.pads[pad]
 
     def getVoice(self, voice):
-        if not hasattr(self, "data") or not self.data or not self.data["samples"]:
+        if voice < 0 or voice >= MAX_VOICES or self.voices[voice] == None:
             return False
-        for i in range(len(self.data["samples"])):
-            if self.samples[i].voice == voice:
-                return self.samples[i]
-        return False
+        return self.voices[voice]
 
 class Config:
     def __init__(self, file=None):
         self.data = dict()
+
+        # Patches are indexed by file offset and only parsed when loaded
+        self.sources = []
+        self.patches = []
+        self.programs = dict()
+
         if file != None:
             self.readFile(file)
 
@@ -335,23 +841,45 @@ class Config:
         return target
 
     def readFile(self, filename, file_prefix=""):
-        file = open(filename, "r")
-        data = json.loads(file.read())
-
-        # Filename prefix
-        if len(file_prefix) > 0 and "patches" in data and len(data["patches"]) > 0:
-            for i, patch in enumerate(data["patches"]):
-                if "samples" in patch and len(patch["samples"]) > 0:
-                    for j, sample in enumerate(patch["samples"]):
-                        if "file" in sample and len(sample["file"]) > 0:
-                            data["patches"][i]["samples"][j]["file"] = file_prefix + sample["file"]
+        data = configcache.load(filename, file_prefix)
+        if data != None:
+            print("Using compiled config:", configcache.get_path(filename))
+        else:
+            data = patchindex.build(filename)
+            if configcache.save(filename, data, file_prefix):
+                print("Compiled config:", configcache.get_path(filename))
 
+        if "patches" in data:
+            self.addPatches(data["patches"], filename, file_prefix)
+            del data["patches"]
         self.mergeData(data)
 
         del data
-        file.close()
-        del file
-        gc.collect()
+        heap.collect()
+
+    def addPatches(self, entries, filename, file_prefix=""):
+        source = len(self.sources)
+        self.sources.append((filename, file_prefix))
+        for entry in entries:
+            index = len(self.patches)
+            self.patches.append((entry[patchindex.ENTRY_NAME], entry[patchindex.ENTRY_OFFSET], entry[patchindex.ENTRY_LENGTH], source))
+            program = entry[patchindex.ENTRY_PROGRAM]
+            if program != None and not program in self.programs:
+                self.programs[program] = index
+
+    def readPatch(self, index):
+        name, offset, length, source = self.patches[index]
+        filename, file_prefix = self.sources[source]
+        data = patchindex.read(filename, offset, length)
+
+        # Filename prefix
+        if len(file_prefix) > 0 and "samples" in data:
+            for sample in data["samples"]:
+                samplelayers.add_prefix(sample, file_prefix)
+        if len(file_prefix) > 0 and "bundle" in data:
+            data["bundle"] = file_prefix + data["bundle"]
+
+        return data
 
     def getData(self, default, group, key=None):
         if not group in self.data or (key != None and not key in self.data[group]):
@@ -366,28 +894,19 @@ class Config:
         self.data[group][key] = value
         return True
 
+    def getPatchCount(self):
+        return len(self.patches)
     def getPatch(self, index):
-        if not "patches" in self.data or index >= len(self.data["patches"]):
+        if index < 0 or index >= len(self.patches):
             return False
-        return self.data["patches"][index]
+        return self.readPatch(index)
     def getSelectorItems(self):
-        items = list()
-
-        if not "patches" in self.data or len(self.data["patches"]) == 0:
-            return items
-
-        for i in range(len(self.data["patches"])):
-            if "name" in self.data["patches"][i]:
-                items.append(self.data["patches"][i]["name"])
-            else:
-                items.append(str(i))
-        return items
+        return [entry[0] for entry in self.patches]
 
     def getProgram(self, num):
-        for i in range(len(self.data["patches"])):
-            if self.data["patches"][i]["program"] == num:
-                return self.data["patches"][i]
-        return False
+        if not num in self.programs:
+            return False
+        return self.getPatch(self.programs[num])
 
     def getAudioBufferSize(self):
         return self.getData(AUDIO_BUFFER_SIZE, "audio", "bufferSize")
@@ -396,6 +915,20 @@ class Config:
     def getAudioOutput(self):
         return self.getData(AUDIO_OUTPUT, "audio", "output")
 
+    def getAudioCacheBytes(self):
+        return self.getData(AUDIO_CACHE_BYTES, "audio", "cacheBytes")
+    def getAudioCachePinBytes(self):
+        return self.getData(AUDIO_CACHE_PIN, "audio", "cachePinBytes")
+    def getAudioVariants(self):
+        return self.getData(AUDIO_VARIANTS, "audio", "variants")
+    def getAudioFlashStreamBytes(self):
+        return max(AUDIO_STREAM_MIN, min(AUDIO_STREAM_MAX, self.getData(AUDIO_FLASH_BYTES, "audio", "flashStreamBytes")))
+    def getAudioSdStreamBytes(self):
+        return max(AUDIO_STREAM_MIN, min(AUDIO_STREAM_MAX, self.getData(AUDIO_SD_BYTES, "audio", "sdStreamBytes")))
+
+    def getAudioVoiceSteal(self):
+        return self.getData(AUDIO_VOICE_STEAL, "audio", "voiceSteal")
+
     def getAudioVolume(self):
         return self.getData(AUDIO_VOLUME, "audio", "volume")
     def setAudioVolume(self, value):
@@ -403,6 +936,15 @@ class Config:
             return False
         return self.setData("audio", "volume", value)
 
+    def getTrellisFps(self):
+        return self.getData(TRELLIS_FPS, "trellis", "fps")
+
+    def getDisplayFps(self):
+        return self.getData(DISPLAY_FPS, "display", "fps")
+
+    def getTaskPeriod(self, name):
+        return self.getData(TASK_PERIODS[name] if name in TASK_PERIODS else 0.0, "tasks", name)
+
     def getMidiChannel(self):
         return self.getData(MIDI_CHANNEL, "midi", "channel")
     def setMidiChannel(self, value):
@@ -410,6 +952,24 @@ class Config:
             return False
         return self.setData("midi", "channel", value)
 
+    def getProfileEnabled(self):
+        return self.getData(PROFILE_ENABLED, "profile", "enabled")
+    def getProfileWindow(self):
+        return self.getData(PROFILE_WINDOW, "profile", "window")
+    def getProfileBudget(self):
+        return self.getData(PROFILE_BUDGET, "profile", "budget")
+
+    def getMemoryReserve(self):
+        return self.getData(MEMORY_RESERVE, "memory", "reserve")
+    def getMemoryMonitor(self):
+        return self.getData(MEMORY_MONITOR, "memory", "monitor")
+
+    def getBootFast(self):
+        return self.getData(BOOT_FAST, "boot", "fast")
+
+    def getStatsLatency(self):
+        return self.getData(STATS_LATENCY, "stats", "latency")
+
     def getMidiThru(self):
         return self.getData(MIDI_THRU, "midi", "thru")
     def setMidiThru(self, value):
@@ -420,44 +980,96 @@ class Config:
 def handleTrellis(event):
     if event.edge == NeoTrellis.EDGE_RISING:
         patch.padOn(event.number)
-        trellis.pixels[event.number] = COLOR_ACTIVE
+        trellis_frame.set(event.number, COLOR_ACTIVE)
     elif event.edge == NeoTrellis.EDGE_FALLING:
         patch.padOff(event.number)
-        trellis.pixels[event.number] = trellis_buffer[event.number]
+        trellis_frame.set(event.number, trellis_buffer[event.number])
+def handleNoteOn(note, velocity):
+    if patch.noteOn(note, velocity) and latency != None:
+        latency.record(ticks_diff(ticks_ms(), midi.timestamp))
+def handleNoteOff(note, velocity):
+    patch.noteOff(note)
+def handleControlChange(control, value):
+    patch.controlChange(control, value)
+def handleProgramChange(program):
+    data = config.getProgram(program)
+    if data:
+        loadPatch(data)
+
+# Double buffered patch switching, the next patch loads in the background and is swapped in once complete
+next_patch = None
+next_patch_start = 0
+patch_switch_time = 0.0
+def loadPatch(data):
+    global next_patch, next_patch_start
+    if next_patch != None:
+        next_patch.unload()
+    next_patch = Patch()
+    if not next_patch.begin(data):
+        next_patch = None
+        return False
+    next_patch_start = time.monotonic_ns()
+    return True
+def updatePatch():
+    global patch, next_patch, patch_switch_time
+    if next_patch == None or not next_patch.step():
+        return False
+    if next_patch.failed:
+        print("Patch Failed:", next_patch.getName())
+        next_patch.unload()
+        next_patch = None
+        return False
+    previous_patch = patch
+    patch = next_patch
+    next_patch = None
+    previous_patch.unload()
+    patch.show()
+    patch_switch_time = (time.monotonic_ns() - next_patch_start) / 1000000
+    print("Patch: {} ({} samples, {:.1f}ms)".format(patch.getName(), len(patch.samples), patch_switch_time))
+    return True
+
 def setTrellisBuffer(pad, color, set=False):
-    if trellis.pixels[pad] == trellis_buffer[pad]:
-        trellis.pixel[pad] = color
+    # Pressed pads keep showing the active color until released
+    if set or trellis_frame.get(pad) == trellis_buffer[pad]:
+        trellis_frame.set(pad, color)
     trellis_buffer[pad] = color
-    if set:
-        trellis.pixels[pad] = trellis_buffer[pad]
 
-display_menu.splash_message("Reading Flash Memory")
 print(":: Reading Flash Memory ::")
+heap = HeapBudget()
 config = Config()
 try:
     config.readFile(CONFIG)
 except:
     print("No internal config file detected.")
 
-display_menu.splash_message("Reading SD Card")
 print(":: Reading SD Card ::")
 spi = SPI(board.GP10, board.GP11, board.GP8)
+sd_mounted = False
 try:
     sd = sdcardio.SDCard(spi, board.GP9)
     vfs = storage.VfsFat(sd)
     storage.mount(vfs, SD_MOUNT)
+    sd_mounted = True
     config.readFile(SD_MOUNT + "/" + SD_CONFIG, SD_MOUNT + "/")
 
-    if not "patches" in config.data or len(config.data["patches"]) == 0:
-        display_menu.splash_message("No Patches Found")
+    if config.getPatchCount() == 0:
         print("No patches or samples provided. Please see repository for config format.")
         sys.exit()
 except:
     print("No SD card detected or invalid file system format. SD card must be formatted as FAT32.")
 
-print("Patches:", len(config.data["patches"]))
+print("Patches:", config.getPatchCount())
+trellis_frame.set_fps(config.getTrellisFps())
+heap.set_reserve(config.getMemoryReserve())
+boot.mark("config")
+
+if not config.getBootFast():
+    initDisplay()
+    # Wait for USB to stabilize
+    time.sleep(0.5)
+    boot.mark("display")
 
-display_menu.splash_message("Initializing Audio")
+splash("Initializing Audio")
 print(":: Initializing Audio ::")
 
 mixer = audiomixer.Mixer(
@@ -469,6 +1081,10 @@ mixer = audiomixer.Mixer(
     samples_signed=True
 )
 
+def releaseVoice(voice, sample):
+    sample.releaseVoice(voice)
+voices = VoicePool(mixer.voice, MAX_VOICES, config.getAudioVoiceSteal(), releaseVoice)
+
 audio = None
 if config.getAudioOutput() == "pwm":
     audio = PWMAudioOut(
@@ -478,7 +1094,7 @@ if config.getAudioOutput() == "pwm":
 elif config.getAudioOutput() == "i2s":
     audio = I2SOut(board.GP0, board.GP1, board.GP2)
 if audio == None:
-    display_menu.splash_message("Invalid Audio Output")
+    splash("Invalid Audio Output")
     print("Invalid audio output type. Please see repository for valid output types.")
     sys.exit()
 audio.play(mixer)
@@ -488,25 +1104,55 @@ print("Sample Rate:", config.getAudioRate())
 print("Channels:", AUDIO_CHANNELS)
 print("Bits:", AUDIO_BITS)
 print("Output:", config.getAudioOutput())
-
-display_menu.splash_message("Initializing Midi")
+print("Voice Stealing:", voices.get_policy())
+
+cache = SampleCache(config.getAudioCacheBytes(), config.getAudioCachePinBytes())
+if cache.is_enabled():
+    print("Sample Cache:", cache.get_budget(), "bytes")
+
+# Stream buffers for as many voices as can play at once, allocated before any patch so they never have to be found later
+flash_streams = StreamPool(MAX_VOICES, config.getAudioFlashStreamBytes())
+print("Flash Streams:", flash_streams.get_count(), "x", flash_streams.get_size(), "bytes")
+sd_streams = None
+if sd_mounted:
+    sd_streams = StreamPool(MAX_VOICES, config.getAudioSdStreamBytes())
+    print("SD Streams:", sd_streams.get_count(), "x", sd_streams.get_size(), "bytes")
+def getStreamPool(path):
+    if sd_streams != None and path.startswith(SD_MOUNT + "/"):
+        return sd_streams
+    return flash_streams
+def printStreams():
+    print("Flash Streams:", flash_streams.get_summary())
+    if sd_streams != None:
+        print("SD Streams:", sd_streams.get_summary())
+
+boot.mark("audio")
+
+splash("Initializing Midi")
 print(":: Initializing Midi ::")
 uart = UART(
     tx=board.GP4,
     rx=board.GP5,
     baudrate=31250,
-    timeout=0.001
+    timeout=0
+)
+latency = LatencyHistogram() if config.getStatsLatency() else None
+midi = MidiIn(
+    uart=uart,
+    channel=config.getMidiChannel()-1,
+    thru=config.getMidiThru(),
+    timestamps=latency != None
 )
-midi = adafruit_midi.MIDI(
-    midi_in=uart,
-    midi_out=uart,
-    in_channel=config.getMidiChannel()-1,
-    out_channel=config.getMidiChannel()-1,
-    debug=False
+midi.set_callbacks(
+    note_on=handleNoteOn,
+    note_off=handleNoteOff,
+    control_change=handleControlChange,
+    program_change=handleProgramChange
 )
-print("Channel:", midi.in_channel+1)
+print("Channel:", midi.channel+1)
+boot.mark("midi")
 
-display_menu.splash_message("Initializing Interface")
+splash("Initializing Interface")
 print(":: Initializing Interface ::")
 
 print("Activating NeoTrellis Keys")
@@ -514,66 +1160,112 @@ for i in range(MAX_PAD):
     trellis.activate_key(i, NeoTrellis.EDGE_RISING)
     trellis.activate_key(i, NeoTrellis.EDGE_FALLING)
     trellis.callbacks[i] = handleTrellis
-    trellis.pixels[i] = COLOR_PURPLE
-    time.sleep(0.05)
-for i in range(MAX_PAD):
-    trellis.pixels[i] = COLOR_OFF
-    time.sleep(0.05)
+if not config.getBootFast():
+    for i in range(MAX_PAD):
+        trellis_frame.set(i, COLOR_PURPLE)
+        trellis_frame.flush()
+        time.sleep(0.05)
+    for i in range(MAX_PAD):
+        trellis_frame.set(i, COLOR_OFF)
+        trellis_frame.flush()
+        time.sleep(0.05)
+boot.mark("interface")
 
-display_menu.splash_message("Loading Default")
+splash("Loading Default")
 print(":: Loading Default Patch ::")
 patch = Patch()
 patch.load(config.getPatch(0))
+boot.mark("patch")
 
-display_menu.splash_message("Initialization Complete")
+splash("Initialization Complete")
 print(":: Initialization Complete ::")
 led.value = False
 
 # Setup Display Menu
 def menu_update(item):
     if item.get_key() == "patch":
-        current_patch = config.getPatch(item.get())
-        patch.load(current_patch)
-        print("Patch:", current_patch["name"])
+        loadPatch(config.getPatch(item.get()))
     elif item.get_key() == "volume":
         config.setAudioVolume(item.get() / 100.0)
+        patch.updateLevels()
+        if next_patch != None:
+            next_patch.updateLevels()
     elif item.get_key() == "midi_channel":
         config.setMidiChannel(item.get())
-        midi.in_channel = config.getMidiChannel()-1
-        midi.out_channel = config.getMidiChannel()-1
+        midi.channel = config.getMidiChannel()-1
         print("Midi Channel:", config.getMidiChannel())
     elif item.get_key() == "midi_thru":
         config.setMidiThru(item.get())
+        midi.thru = config.getMidiThru()
         print("Midi Thru:", config.getMidiThru())
-
-display_menu.setup(menu_update)
-patch_item = display_menu.find_item("patch")
-if patch_item != None:
-    patch_item.set_items(config.getSelectorItems())
-    display_menu.draw()
-
-while True:
+    elif item.get_key() == "stats_dump":
+        print(":: Midi Latency ::")
+        if latency != None:
+            latency.dump()
+        else:
+            print("Disabled")
+    elif item.get_key() == "stats_reset":
+        if latency != None:
+            latency.reset()
+            updateStats()
+
+patch_item = None
+stats_group = None
+stats_count_item = None
+stats_max_item = None
+stats_percent_items = []
+def setupMenu():
+    global patch_item, stats_group, stats_count_item, stats_max_item, stats_percent_items
+    display_menu.setup(menu_update)
+    patch_item = display_menu.find_item("patch")
+    if patch_item != None:
+        patch_item.set_items(config.getSelectorItems())
+        display_menu.draw()
+
+    stats_group = display_menu.find_item("stats")
+    stats_count_item = display_menu.find_item("stats_count")
+    stats_max_item = display_menu.find_item("stats_max")
+    stats_percent_items = [(display_menu.find_item("stats_p" + str(percent)), percent) for percent in (50, 95, 99)]
+
+if display_menu != None:
+    setupMenu()
+
+def updateStats():
+    if latency == None or not latency.get_count():
+        return
+    if stats_count_item != None:
+        stats_count_item.set(str(latency.get_count()))
+    for item, percent in stats_percent_items:
+        if item != None:
+            item.set("{}ms".format(latency.get_percentile(percent)))
+    if stats_max_item != None:
+        stats_max_item.set("{}ms".format(latency.get_max()))
+    if stats_group != None and display_menu != None and display_menu.current_group == stats_group:
+        display_menu.draw()
+
+# Main Loop Tasks
+
+def trellis_task():
     # trigger callbacks
     trellis.sync()
+    trellis_frame.update()
 
-    # Update menu
-    display_menu.update()
-
-    while True:
-        msg_in = midi.receive()
-        if msg_in == None:
-            break
+def menu_task():
+    if display_menu != None:
+        display_menu.update()
 
-        if config.getMidiThru():
-            midi.send(msg_in)
+def boot_task():
+    # Deferred by fast boot until the default patch can be played
+    initDisplay()
+    setupMenu()
+    boot.mark("menu")
+    print(boot.get_summary())
 
-        if isinstance(msg_in, NoteOn):
-            patch.noteOn(msg_in.note, msg_in.velocity / 127.0)
-        elif isinstance(msg_in, NoteOff):
-            patch.noteOff(msg_in.note)
-        elif isinstance(msg_in, ProgramChange):
-            patch.load(config.getProgram(msg_in.patch))
+def midi_task():
+    while midi.poll():
+        pass
 
+def leds_task():
     playing = False
     for i in range(MAX_VOICES):
         if mixer.voice[i].playing:
@@ -583,16 +1275,63 @@ while True:
 
     for i in range(MAX_PAD):
         sample = patch.getPad(i)
-        if not sample or sample.voice < 0:
+        if not sample or sample.getVoice() < 0:
             continue
-        if mixer.voice[sample.voice].playing:
-            setTrellisBuffer(i, sample.color)
+        if sample.update():
+            setTrellisBuffer(i, sample.getColor())
         else:
-            setTrellisBuffer(i, tuple(int(c/2) for c in sample.color))
-            sample.stop()
-
-    time.sleep(0.02)
+            setTrellisBuffer(i, sample.getDimColor())
+
+def loader_task():
+    updatePatch()
+
+def stats_task():
+    updateStats()
+
+def heap_task():
+    heap.update()
+
+def report_task():
+    task = scheduler.get("midi")
+    print("Midi Latency (worst): {:.2f}ms, Polls: {}".format(task.get_worst_latency() * 1000, task.runs))
+    if display_menu != None:
+        print("Menu Redraw (worst): {:.2f}ms render, {:.2f}ms refresh, Refreshes: {}".format(display_menu.max_render_time / 1000000, display_menu.max_refresh_time / 1000000, display_menu.refreshes))
+    if latency != None:
+        print("Midi to Voice:", latency.get_summary())
+    printStreams()
+    if config.getMemoryMonitor():
+        print(heap.get_summary())
+        heap.reset()
+    if display_menu != None:
+        display_menu.reset_times()
+    scheduler.reset()
+
+profiler = Profiler(config.getProfileWindow(), config.getProfileBudget()) if config.getProfileEnabled() else None
+# Task intervals and durations are only timed when something reports them
+scheduler = Scheduler(profiler, config.getTaskPeriod("report") > 0)
+scheduler.add("midi", midi_task, config.getTaskPeriod("midi"))
+scheduler.add("trellis", trellis_task, config.getTaskPeriod("trellis"))
+scheduler.add("leds", leds_task, config.getTaskPeriod("leds"))
+scheduler.add("menu", menu_task, config.getTaskPeriod("menu"))
+scheduler.add("loader", loader_task, config.getTaskPeriod("loader"))
+if config.getTaskPeriod("report") > 0:
+    scheduler.add("report", report_task, config.getTaskPeriod("report"))
+if latency != None:
+    scheduler.add("stats", stats_task, config.getTaskPeriod("stats"))
+if config.getMemoryMonitor():
+    scheduler.add("heap", heap_task, config.getTaskPeriod("heap"))
+if display_menu == None:
+    scheduler.defer("boot", boot_task)
+
+if profiler != None:
+    print("Profile: every {:.1f}s, budget {:.1f}ms".format(profiler.get_window(), profiler.get_budget() * 1000))
+print("Tasks:", ", ".join(["{} {:.1f}ms".format(task.get_name(), task.get_period() * 1000) for task in scheduler]))
+boot.mark("tasks")
+boot.mark_ready()
+print(boot.get_summary())
+scheduler.run()
 
 print("\n:: Program Shutting Down ::")
-display_menu.deinit()
+if display_menu != None:
+    display_menu.deinit()
 mod_encoder.deinit()
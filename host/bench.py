@@ -0,0 +1,226 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: bench.py
+Title: Control Path Benchmarks
+Version: 0.1.0
+Since: 0.1.0
+
+Boots code.py with the host stand-ins and times the functions which decide
+how quickly a hit is answered: note and pad lookups, voice allocation in
+Sample.noteOn, config parsing and menu redraws. Times are CPython wall time
+so they are only meaningful compared with runs on the same computer.
+
+    python host/bench.py --output before.json
+    python host/bench.py --compare before.json --threshold 0.2
+
+Compare mode exits with status 1 when any benchmark is slower than the
+baseline by more than the threshold.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+
+import hostenv
+
+PATCH_SIZES = (8, 64, 256)
+CONFIG_SIZES = (16, 128) # Patches of 8 samples each
+SAMPLE_FILE = "/samples/hihat.wav"
+REPEAT = 7
+ROUND_NS = 100000000 # Each round calls a benchmark for at least this long so that rounds repeat
+
+class Bench:
+    def __init__(self, repeat=REPEAT):
+        self.repeat = repeat
+        self.results = dict()
+
+    def time(self, name, callback, ops=1, setup=None):
+        """Record the median and best time per operation of callback over several rounds."""
+        # One untimed call warms up and decides how many calls make a round
+        calls = max(1, ROUND_NS // max(1, self.call(callback, setup)))
+        samples = []
+        for i in range(self.repeat):
+            gc.collect()
+            gc.disable()
+            try:
+                total = 0
+                for j in range(calls):
+                    total += self.call(callback, setup)
+                samples.append(total / (ops * calls))
+            finally:
+                gc.enable()
+        self.results[name] = {
+            "ns_per_op": statistics.median(samples),
+            "min_ns_per_op": min(samples),
+            "ops": ops,
+            "calls": calls,
+        }
+        return self.results[name]
+
+    def call(self, callback, setup=None):
+        # Setup isn't timed
+        if setup != None:
+            setup()
+        start = time.perf_counter_ns()
+        callback()
+        return time.perf_counter_ns() - start
+
+def make_patch_data(count):
+    samples = []
+    for i in range(count):
+        samples.append({
+            "file": SAMPLE_FILE,
+            "note": i % 128,
+            "pad": i % 16,
+            "level": 1.0,
+        })
+    return {"name": "Bench {}".format(count), "samples": samples}
+
+def make_config(directory, count):
+    filename = os.path.join(directory, "bench{}.json".format(count))
+    data = {
+        "version": 1,
+        "midi": {"channel": 10, "thru": False},
+        "audio": {"bufferSize": 256, "rate": 44100, "output": "i2s", "volume": 1.0},
+        "patches": [dict(make_patch_data(8), program=i % 128, name="Patch {}".format(i)) for i in range(count)],
+    }
+    with open(filename, "w") as file:
+        json.dump(data, file, indent=4)
+    return filename
+
+def bench_lookups(bench, namespace):
+    Patch = namespace["Patch"]
+    for count in PATCH_SIZES:
+        patch = Patch()
+        patch.load(make_patch_data(count))
+        notes = list(range(128)) * 64
+        pads = list(range(16)) * 512
+        def get_notes():
+            for note in notes:
+                patch.getNote(note)
+        def get_pads():
+            for pad in pads:
+                patch.getPad(pad)
+        bench.time("patch.getNote/{}".format(count), get_notes, len(notes))
+        bench.time("patch.getPad/{}".format(count), get_pads, len(pads))
+
+        # Every voice busy so each hit has to search for one to steal
+        samples = patch.samples[0:min(count, 32)]
+        hits = samples * 64
+        def note_on():
+            for sample in hits:
+                sample.noteOn(100)
+        bench.time("sample.noteOn/{}".format(count), note_on, len(hits), namespace["voices"].release_all)
+        namespace["voices"].release_all()
+        patch.unload()
+
+def bench_config(bench, namespace, directory):
+    Config = namespace["Config"]
+    configcache = namespace["configcache"]
+    for count in CONFIG_SIZES:
+        filename = make_config(directory, count)
+        def clear_cache():
+            if os.path.exists(configcache.get_path(filename)):
+                os.remove(configcache.get_path(filename))
+        def read():
+            config = Config()
+            config.readFile(filename)
+        bench.time("config.readFile/{}".format(count), read, 1, clear_cache)
+        bench.time("config.readFile/{}/compiled".format(count), read)
+
+def bench_menu(bench, namespace, device):
+    menu = namespace["display_menu"]
+    steps = 256
+    def reset():
+        device.controls = hostenv.ControlSource()
+        menu.last_position = 0
+    def turn():
+        # Alternate directions so the selection stays within the menu
+        for i in range(steps):
+            device.controls.add_turn(device.clock.now(), 1 if i % 2 == 0 else -1)
+            menu.update()
+    def draw():
+        for i in range(steps):
+            menu.current_group._selected = i % len(menu.current_group)
+            menu.draw()
+    bench.time("menu.update", turn, steps, reset)
+    bench.time("menu.draw", draw, steps)
+
+def run(repeat=REPEAT):
+    # The largest patches are past what the heap budget lets the device load, only their lookups are timed
+    hostenv.HEAP_SIZE = 1024 * 1024
+    device = hostenv.Device()
+    device.install()
+    bench = Bench(repeat)
+    directory = tempfile.mkdtemp()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            namespace = device.boot()
+            bench_lookups(bench, namespace)
+            bench_config(bench, namespace, directory)
+            bench_menu(bench, namespace, device)
+    finally:
+        shutil.rmtree(directory)
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repeat": repeat,
+        "benchmarks": bench.results,
+    }
+
+def compare(report, baseline, threshold):
+    """Print each benchmark against the baseline and return the names of regressions, best rounds are compared as they are the least noisy."""
+    regressions = []
+    for name, result in report["benchmarks"].items():
+        if not name in baseline["benchmarks"]:
+            print("{:32} {:>12.1f}ns        new".format(name, result["min_ns_per_op"]))
+            continue
+        before = baseline["benchmarks"][name]["min_ns_per_op"]
+        change = result["min_ns_per_op"] / before - 1 if before else 0
+        flag = ""
+        if change > threshold:
+            flag = "REGRESSION"
+            regressions.append(name)
+        print("{:32} {:>12.1f}ns {:>+7.1%} {}".format(name, result["min_ns_per_op"], change, flag))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the control path of code.py on the host.")
+    parser.add_argument("--output", default=None, help="write the results to this JSON file")
+    parser.add_argument("--compare", default=None, help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown counted as a regression, 0.2 is 20%%")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="rounds of each benchmark, the best round is compared with --compare")
+    args = parser.parse_args()
+
+    # The device changes into its root directory
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    report = run(args.repeat)
+    if output:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=4)
+
+    if baseline:
+        with open(baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print("Regressions: {}".format(", ".join(regressions)))
+            raise SystemExit(1)
+    elif not output:
+        print(json.dumps(report, indent=4))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: bundle.py
+Title: Patch Bundler
+Version: 0.1.0
+Since: 0.1.0
+
+Packs every file of each patch with a "bundle" setting into that one file,
+in the format of lib/patchbundle.py. Pitch variants rendered by
+host/variants.py are packed along with their originals. Samples are
+stored as 16 bit PCM at their own sample rate and channel count, run
+host/condition.py first to match them to the mixer.
+
+    python host/bundle.py
+    python host/bundle.py config.json /media/sd/config.json
+    python host/bundle.py --dry-run
+
+Bundles are only built again when the config or one of the samples is
+newer.
+"""
+
+import argparse
+import json
+import os
+import sys
+import wave
+
+import numpy
+
+import hostenv
+sys.path.insert(0, hostenv.STANDINS_DIR)
+sys.path.insert(0, os.path.join(hostenv.ROOT_DIR, "lib"))
+
+import condition
+import patchbundle
+import pitchvariants
+import samplelayers
+
+def get_names(patch, root):
+    """Return the name of every file of a patch as the device sees it, variants included when they've been rendered."""
+    names = []
+    for sample in patch.get("samples", []):
+        low, high, note = pitchvariants.get_range(sample)
+        for name in samplelayers.get_all_files(sample):
+            for offset in range(low - note, high - note + 1):
+                variant = pitchvariants.get_path(name, offset)
+                if variant in names:
+                    continue
+                if offset == 0 or os.path.exists(os.path.join(root, variant.lstrip("/"))):
+                    names.append(variant)
+    return names
+
+def get_jobs(configs, force=False):
+    """Return (config, bundle, root, names) for every bundle which needs building."""
+    jobs = []
+    for filename in configs:
+        with open(filename, "r") as file:
+            data = json.load(file)
+        root = os.path.dirname(os.path.abspath(filename))
+        for patch in data.get("patches", []):
+            if not "bundle" in patch:
+                continue
+            path = os.path.join(root, patch["bundle"].lstrip("/"))
+            names = get_names(patch, root)
+            if not force and os.path.exists(path):
+                built = os.path.getmtime(path)
+                paths = [filename] + [os.path.join(root, name.lstrip("/")) for name in names]
+                if all([os.path.exists(item) and os.path.getmtime(item) <= built for item in paths]):
+                    continue
+            jobs.append((filename, path, root, names))
+    return jobs
+
+def build(path, root, names, dry_run=False):
+    """Returns the bytes of PCM packed."""
+    entries = []
+    for name in names:
+        data, rate, width = condition.read(os.path.join(root, name.lstrip("/")))
+        pcm = numpy.clip(numpy.round(data * 32768), -32768, 32767).astype("<i2").tobytes()
+        entries.append((name, pcm, rate, data.shape[1]))
+    if not dry_run:
+        temp = path + ".tmp"
+        with open(temp, "wb") as file:
+            patchbundle.write(file, entries)
+        os.replace(temp, path)
+    return sum([patchbundle.align(len(pcm)) for name, pcm, rate, channels in entries])
+
+def main():
+    parser = argparse.ArgumentParser(description="Pack the samples of each patch with a bundle setting into one file.")
+    parser.add_argument("configs", nargs="*", default=[os.path.join(hostenv.ROOT_DIR, "config.json")], help="config files")
+    parser.add_argument("--force", action="store_true", help="build every bundle, even when up to date")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing any files")
+    args = parser.parse_args()
+
+    jobs = get_jobs(args.configs, args.force)
+    total = 0
+    for filename, path, root, names in jobs:
+        try:
+            size = build(path, root, names, args.dry_run)
+        except (OSError, EOFError, ValueError, wave.Error) as error:
+            print("{}: error: {}".format(path, error))
+            continue
+        total += size
+        name = os.path.relpath(path)
+        print("{}: {} files ({} bytes)".format(path if name.startswith("..") else name, len(names), size))
+
+    print("Bundles: {} built, {} bytes".format(len(jobs), total))
+
+if __name__ == "__main__":
+    main()
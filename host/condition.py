@@ -0,0 +1,192 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: condition.py
+Title: Sample Conditioner
+Version: 0.1.0
+Since: 0.1.0
+
+Converts every sample referenced by one or more config files to the format
+the device mixer expects (16 bit signed, the configured sample rate and
+channel count) and trims silence from both ends. Files are rewritten in
+place and only when something changed.
+
+    python host/condition.py
+    python host/condition.py config.json /media/sd/config.json --jobs 4
+    python host/condition.py --dry-run
+
+Sample paths in a config are relative to the folder holding that config,
+the same way the device resolves them against CIRCUITPY or the SD card.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import wave
+
+import numpy
+
+import hostenv
+sys.path.insert(0, os.path.join(hostenv.ROOT_DIR, "lib"))
+
+import samplelayers
+
+AUDIO_RATE = 22050 # Defaults of code.py
+AUDIO_CHANNELS = 2
+AUDIO_BITS = 16
+
+TAPS = 16 # Zero crossings on each side of the resampling kernel
+BLOCK = 4096 # Output frames resampled at once
+THRESHOLD = -60.0 # dBFS below which the ends of a sample count as silence
+LEAD = 0.0005 # Seconds kept before the first sound so the attack isn't clipped
+FADE = 0.005 # Seconds of fade out after the last sound
+
+def get_settings(configs):
+    # Later configs override earlier ones, like Config.mergeData on the device
+    rate = AUDIO_RATE
+    files = []
+    for filename in configs:
+        with open(filename, "r") as file:
+            data = json.load(file)
+        if "audio" in data and "rate" in data["audio"]:
+            rate = data["audio"]["rate"]
+        root = os.path.dirname(os.path.abspath(filename))
+        for patch in data.get("patches", []):
+            for sample in patch.get("samples", []):
+                for name in samplelayers.get_all_files(sample):
+                    path = os.path.join(root, name.lstrip("/"))
+                    if not path in files:
+                        files.append(path)
+    return rate, files
+
+def read(filename):
+    """Return the frames of a PCM wave file as floats within -1.0 to 1.0 and its sample rate."""
+    with wave.open(filename, "rb") as reader:
+        channels = reader.getnchannels()
+        width = reader.getsampwidth()
+        rate = reader.getframerate()
+        raw = reader.readframes(reader.getnframes())
+
+    if width == 1:
+        data = (numpy.frombuffer(raw, dtype=numpy.uint8).astype(numpy.float64) - 128) / 128
+    elif width == 2:
+        data = numpy.frombuffer(raw, dtype="<i2").astype(numpy.float64) / 32768
+    elif width == 3:
+        bytes3 = numpy.frombuffer(raw, dtype=numpy.uint8).reshape(-1, 3).astype(numpy.int32)
+        values = bytes3[:, 0] | (bytes3[:, 1] << 8) | (bytes3[:, 2] << 16)
+        values = numpy.where(values & 0x800000, values - 0x1000000, values)
+        data = values.astype(numpy.float64) / 8388608
+    elif width == 4:
+        data = numpy.frombuffer(raw, dtype="<i4").astype(numpy.float64) / 2147483648
+    else:
+        raise ValueError("Unsupported sample width: {}".format(width))
+    return data.reshape(-1, channels), rate, width
+
+def remix(data, channels):
+    if data.shape[1] == channels:
+        return data
+    mono = data.mean(axis=1, keepdims=True)
+    return numpy.repeat(mono, channels, axis=1)
+
+def resample(data, source_rate, target_rate, taps=TAPS):
+    """Band limited resampling with a Blackman windowed sinc kernel, vectorised over blocks of output frames."""
+    if source_rate == target_rate or len(data) == 0:
+        return data
+    ratio = target_rate / source_rate
+    cutoff = min(1.0, ratio) # Low pass below the new Nyquist frequency when downsampling
+    half = int(numpy.ceil(taps / cutoff))
+    offsets = numpy.arange(-half + 1, half + 1)
+
+    count = int(round(len(data) * ratio))
+    output = numpy.empty((count, data.shape[1]))
+    for start in range(0, count, BLOCK):
+        positions = numpy.arange(start, min(count, start + BLOCK)) / ratio
+        indexes = numpy.floor(positions).astype(numpy.int64)[:, None] + offsets
+        x = indexes - positions[:, None]
+        window = 0.42 + 0.5 * numpy.cos(numpy.pi * x / half) + 0.08 * numpy.cos(2 * numpy.pi * x / half)
+        weights = cutoff * numpy.sinc(cutoff * x) * numpy.where(numpy.abs(x) < half, window, 0.0)
+        weights = numpy.where((indexes >= 0) & (indexes < len(data)), weights, 0.0)
+        output[start:start + len(positions)] = numpy.einsum("ot,otc->oc", weights, data[numpy.clip(indexes, 0, len(data) - 1)])
+    return output
+
+def trim(data, rate, threshold=THRESHOLD):
+    """Drop leading and trailing frames quieter than the threshold and fade out the new end."""
+    level = 10 ** (threshold / 20)
+    loud = numpy.nonzero(numpy.abs(data).max(axis=1) > level)[0]
+    if len(loud) == 0:
+        return data[0:0]
+    start = max(0, loud[0] - int(LEAD * rate))
+    end = min(len(data), loud[-1] + 1 + int(FADE * rate))
+    data = data[start:end].copy()
+    fade = min(len(data), end - loud[-1] - 1)
+    if fade > 0:
+        data[-fade:] *= numpy.linspace(1.0, 0.0, fade)[:, None]
+    return data
+
+def write(filename, data, rate):
+    values = numpy.clip(numpy.round(data * 32768), -32768, 32767).astype("<i2")
+    temp = filename + ".tmp"
+    with wave.open(temp, "wb") as writer:
+        writer.setnchannels(data.shape[1])
+        writer.setsampwidth(AUDIO_BITS // 8)
+        writer.setframerate(rate)
+        writer.writeframes(values.tobytes())
+    os.replace(temp, filename)
+
+def condition(job):
+    """Worker process entry, returns (filename, bytes before, bytes after, status)."""
+    filename, rate, channels, threshold, dry_run = job
+    try:
+        before = os.path.getsize(filename)
+        data, source_rate, width = read(filename)
+        frames = len(data)
+        converted = source_rate != rate or data.shape[1] != channels or width != AUDIO_BITS // 8
+        data = resample(remix(data, channels), source_rate, rate)
+        if threshold != None:
+            data = trim(data, rate, threshold)
+    except (OSError, EOFError, ValueError, wave.Error) as error:
+        return filename, 0, 0, "error: {}".format(error)
+
+    if not converted and len(data) == frames:
+        return filename, before, before, "ok"
+    status = "converted" if converted else "trimmed"
+    if len(data) == 0:
+        return filename, before, before, "silent, skipped"
+    if not dry_run:
+        write(filename, data, rate)
+    return filename, before, 44 + len(data) * channels * AUDIO_BITS // 8, status
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and trim the samples of config files for the device.")
+    parser.add_argument("configs", nargs="*", default=[os.path.join(hostenv.ROOT_DIR, "config.json")], help="config files, the last to set audio.rate decides the rate")
+    parser.add_argument("--rate", type=int, default=None, help="sample rate, overrides the configs")
+    parser.add_argument("--channels", type=int, default=AUDIO_CHANNELS, help="channel count of the mixer")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="silence threshold in dBFS")
+    parser.add_argument("--no-trim", action="store_true", help="keep silence at the ends of samples")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing any files")
+    args = parser.parse_args()
+
+    rate, files = get_settings(args.configs)
+    if args.rate:
+        rate = args.rate
+    print("Format: {}Hz, {} channels, {} bit".format(rate, args.channels, AUDIO_BITS))
+
+    jobs = [(filename, rate, args.channels, None if args.no_trim else args.threshold, args.dry_run) for filename in files]
+    total_before = 0
+    total_after = 0
+    with multiprocessing.Pool(max(1, args.jobs)) as pool:
+        for filename, before, after, status in pool.imap_unordered(condition, jobs):
+            total_before += before
+            total_after += after
+            name = os.path.relpath(filename)
+            print("{}: {} ({} -> {} bytes)".format(filename if name.startswith("..") else name, status, before, after))
+
+    print("Samples: {}, {} -> {} bytes, {} bytes saved".format(len(files), total_before, total_after, total_before - total_after))
+
+if __name__ == "__main__":
+    main()
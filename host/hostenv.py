@@ -0,0 +1,339 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: hostenv.py
+Title: Host Environment
+Version: 0.1.0
+Since: 0.1.0
+
+Shared state for the hardware stand-ins found in host/standins. The device
+is simulated on a deterministic clock which only moves forward when the
+firmware sleeps or blocks on a peripheral, so two runs with the same
+script produce the same timings.
+"""
+
+import asyncio
+import builtins
+import gc
+import os
+import selectors
+import sys
+import time
+import tracemalloc
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+STANDINS_DIR = os.path.join(HOST_DIR, "standins")
+ROOT_DIR = os.path.dirname(HOST_DIR)
+
+HEAP_SIZE = 192 * 1024 # Roughly what CircuitPython leaves free on the RP2040
+LOOP_NS = 100000 # Cost charged for each pass of the asyncio event loop
+
+BUTTON_PIN = "GP7" # Menu encoder button of code.py
+MIDI_BAUDRATE = 31250
+MIDI_BYTE_NS = 10 * 1000000000 // MIDI_BAUDRATE # start + 8 data + stop bits
+
+class HostExit(BaseException):
+    """Raised inside the firmware to stop the simulation."""
+    pass
+
+class Clock:
+    def __init__(self, cpu_scale=0.0):
+        self.ns = 0
+        self.cpu_scale = cpu_scale
+        self.deadline = None
+        self._real = time.perf_counter_ns()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def now(self):
+        # Optionally charge host CPU time to the device, scaled to approximate the RP2040
+        if self.cpu_scale > 0:
+            real = time.perf_counter_ns()
+            self.ns += int((real - self._real) * self.cpu_scale)
+            self._real = real
+        return self.ns
+
+    def advance(self, ns):
+        self.now()
+        self.ns += max(0, int(ns))
+        self.tick()
+
+    def tick(self):
+        for callback in self._listeners:
+            callback(self.ns)
+        if self.deadline != None and self.ns >= self.deadline:
+            # Only raised once so that the firmware is able to clean up
+            self.deadline = None
+            raise HostExit()
+
+    # Replacements for the time module
+    def monotonic(self):
+        return self.now() / 1000000000
+    def monotonic_ns(self):
+        return self.now()
+    def sleep(self, seconds):
+        self.advance(seconds * 1000000000)
+
+class ClockSelector(selectors.BaseSelector):
+    """Event loop selector which advances the simulated clock instead of blocking."""
+
+    def __init__(self, clock, loop_ns=LOOP_NS):
+        self._clock = clock
+        self._loop_ns = loop_ns
+        self._keys = dict()
+
+    def register(self, fileobj, events, data=None):
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        key = selectors.SelectorKey(fileobj, fd, events, data)
+        self._keys[fd] = key
+        return key
+
+    def unregister(self, fileobj):
+        fd = fileobj if isinstance(fileobj, int) else fileobj.fileno()
+        return self._keys.pop(fd)
+
+    def select(self, timeout=None):
+        if timeout == None:
+            # Nothing left to wake up for, the firmware would idle forever
+            raise HostExit()
+        self._clock.advance(max(timeout * 1000000000, self._loop_ns))
+        return []
+
+    def get_map(self):
+        return self._keys
+
+class ClockEventLoopPolicy(asyncio.DefaultEventLoopPolicy):
+    def __init__(self, clock, loop_ns=LOOP_NS):
+        super().__init__()
+        self._clock = clock
+        self._loop_ns = loop_ns
+
+    def new_event_loop(self):
+        return asyncio.SelectorEventLoop(ClockSelector(self._clock, self._loop_ns))
+
+class MidiSource:
+    """Scriptable UART byte stream, bytes arrive at the MIDI baud rate."""
+
+    def __init__(self):
+        self._bytes = [] # (arrival ns, byte)
+        self._position = 0
+        self._last = 0
+
+    def add(self, ns, data):
+        ns = max(ns, self._last)
+        for byte in data:
+            ns += MIDI_BYTE_NS
+            self._bytes.append((ns, byte))
+        self._last = ns
+        return ns
+
+    def available(self, now):
+        count = 0
+        while self._position + count < len(self._bytes) and self._bytes[self._position + count][0] <= now:
+            count += 1
+        return count
+
+    def read(self, now, count):
+        data = self._bytes[self._position:self._position + min(count, self.available(now))]
+        self._position += len(data)
+        return data
+
+    def remaining(self):
+        return len(self._bytes) - self._position
+
+class KeySource:
+    """Scripted NeoTrellis key events as (ns, key, pressed)."""
+
+    def __init__(self):
+        self._events = []
+
+    def add(self, ns, key, pressed):
+        self._events.append((ns, key, pressed))
+        self._events.sort(key=lambda event: event[0])
+
+    def pop(self, now):
+        events = []
+        while self._events and self._events[0][0] <= now:
+            events.append(self._events.pop(0))
+        return events
+
+class ControlSource:
+    """Scripted menu encoder turns as (ns, steps) and menu button presses as (ns, pressed)."""
+
+    def __init__(self):
+        self._turns = []
+        self._presses = []
+
+    def add_turn(self, ns, steps):
+        self._turns.append((ns, steps))
+    def add_press(self, ns, pressed):
+        self._presses.append((ns, pressed))
+        self._presses.sort(key=lambda event: event[0])
+
+    def get_position(self, now):
+        return sum([steps for ns, steps in self._turns if ns <= now])
+    def is_pressed(self, now):
+        pressed = False
+        for ns, value in self._presses:
+            if ns > now:
+                break
+            pressed = value
+        return pressed
+
+class Stats:
+    def __init__(self):
+        self.iterations = 0
+        self.first_iteration = None
+        self.notes_received = 0
+        self.notes_played = 0
+        self.latencies = []
+        self.bytes_out = bytearray()
+        self._pending = []
+
+    def note_drained(self, arrival, mapped=True):
+        self.notes_received += 1
+        if mapped:
+            self._pending.append(arrival)
+
+    def voice_played(self, now):
+        if not self._pending:
+            return
+        self.notes_played += 1
+        self.latencies.append(now - self._pending.pop(0))
+
+    def flush(self):
+        # Called once per main loop pass, anything still pending was dropped
+        self._pending = []
+
+    def latency_summary(self):
+        if not self.latencies:
+            return None
+        values = sorted(self.latencies)
+        def percentile(p):
+            return values[min(len(values) - 1, int(len(values) * p))]
+        return {
+            "count": len(values),
+            "min_ms": values[0] / 1000000,
+            "mean_ms": sum(values) / len(values) / 1000000,
+            "p50_ms": percentile(0.5) / 1000000,
+            "p95_ms": percentile(0.95) / 1000000,
+            "p99_ms": percentile(0.99) / 1000000,
+            "max_ms": values[-1] / 1000000,
+        }
+
+class Device:
+    """A single simulated Pico, install() must be called before the firmware is imported."""
+
+    def __init__(self, root=ROOT_DIR, sd=None, cpu_scale=0.0, loop_ns=LOOP_NS, trace_memory=False):
+        self.root = os.path.abspath(root)
+        self.trace_memory = trace_memory
+        self.loop_ns = loop_ns
+        self.sd = os.path.abspath(sd) if sd else None
+        self.clock = Clock(cpu_scale)
+        self.midi = MidiSource()
+        self.keys = KeySource()
+        self.controls = ControlSource()
+        self.stats = Stats()
+        self.mounts = dict()
+        self.mixers = []
+        self.stop_on_sync = False
+        self.record = False
+        self.namespace = None
+        self._open = builtins.open
+        self._stat = os.stat
+
+    # Device filesystem, absolute paths are relative to CIRCUITPY or a mount point
+    def mount(self, path, directory):
+        self.mounts[path.rstrip("/")] = directory
+
+    def device_path(self, path):
+        if not isinstance(path, str) or not path.startswith("/"):
+            return path
+        for mount, directory in self.mounts.items():
+            if path == mount or path.startswith(mount + "/"):
+                return directory + path[len(mount):]
+        name = path[1:].split("/")[0]
+        if name:
+            try:
+                self._stat(os.path.join(self.root, name))
+                return os.path.join(self.root, path[1:])
+            except OSError:
+                pass
+        return path
+
+    def _device_open(self, file, *args, **kwargs):
+        return self._open(self.device_path(file), *args, **kwargs)
+
+    def _device_stat(self, path, *args, **kwargs):
+        return self._stat(self.device_path(path), *args, **kwargs)
+
+    def install(self):
+        global device
+        device = self
+
+        for path in (os.path.join(self.root, "lib"), STANDINS_DIR):
+            if path in sys.path:
+                sys.path.remove(path)
+            sys.path.insert(0, path)
+
+        time.monotonic = self.clock.monotonic
+        time.monotonic_ns = self.clock.monotonic_ns
+        time.sleep = self.clock.sleep
+        builtins.open = self._device_open
+        os.stat = self._device_stat
+        asyncio.set_event_loop_policy(ClockEventLoopPolicy(self.clock, self.loop_ns))
+
+        # CircuitPython heap reporting, CPython object sizes only give a rough comparison
+        if self.trace_memory:
+            tracemalloc.start()
+        gc.mem_alloc = self.mem_alloc
+        gc.mem_free = self.mem_free
+
+        self.clock.add_listener(self._tick)
+        os.chdir(self.root)
+
+    def mem_alloc(self):
+        if not tracemalloc.is_tracing():
+            return 0
+        return tracemalloc.get_traced_memory()[0]
+
+    def mem_free(self):
+        return max(0, HEAP_SIZE - self.mem_alloc())
+
+    def _tick(self, now):
+        for mixer in self.mixers:
+            mixer.advance(now)
+
+    def is_mapped(self, note):
+        # Only notes which the loaded patch responds to are expected to start a voice
+        if not self.namespace or not "patch" in self.namespace:
+            return False
+        return bool(self.namespace["patch"].getNote(note))
+
+    def _exec(self, filename="code.py"):
+        self.namespace = {"__name__": "__main__", "__file__": os.path.join(self.root, filename)}
+        with self._open(self.namespace["__file__"], "r") as file:
+            source = file.read()
+        try:
+            exec(compile(source, filename, "exec"), self.namespace)
+        except (HostExit, SystemExit):
+            pass
+        return self.namespace
+
+    def boot(self):
+        """Run code.py until the main loop is reached and return its globals."""
+        self.stop_on_sync = True
+        self.clock.deadline = None
+        return self._exec()
+
+    def run(self, seconds, filename="code.py"):
+        """Run a script (code.py by default) from power on for the given number of simulated seconds."""
+        self.stop_on_sync = False
+        self.clock.deadline = self.clock.ns + int(seconds * 1000000000)
+        return self._exec(filename)
+
+device = None
@@ -0,0 +1,331 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: render.py
+Title: Offline Renderer
+Version: 0.1.0
+Since: 0.1.0
+
+Plays a Standard MIDI File through a patch of a config file and writes the
+result as a WAV file, as fast as NumPy can mix it. Samples follow the same
+note, range, layers, level, minLevel, velocityCurve, pan, loop, noteOff and
+maxVoices rules as code.py, including the pitch variants rendered by
+host/variants.py, and voices are allocated by lib/voicepool.py with the device's
+voice limit.
+
+    python host/render.py song.mid out.wav
+    python host/render.py song.mid out.wav --config /media/sd/config.json --patch 2 --log voices.txt
+
+The log lists every note on as "seconds note velocity voice", with a voice
+of -1 when the note was dropped, which makes a simple golden file for voice
+allocation.
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import wave
+
+import numpy
+
+import hostenv
+sys.path.insert(0, hostenv.STANDINS_DIR)
+sys.path.insert(0, os.path.join(hostenv.ROOT_DIR, "lib"))
+
+from audiocore import WaveFile
+from audiomixer import MixerVoice
+from voicepool import VoicePool
+import velocitycurve
+import samplelayers
+import pitchvariants
+
+MAX_VOICES = 8 # Defaults of code.py
+MIDI_CHANNEL = 10
+AUDIO_RATE = 22050
+AUDIO_CHANNELS = 2
+AUDIO_VOLUME = 1.0
+AUDIO_VOICE_STEAL = "oldest"
+
+CC_ALL_SOUND_OFF = 120
+CC_ALL_NOTES_OFF = 123
+
+TEMPO = 500000 # Microseconds per quarter note until the first tempo event
+
+def read_smf(filename):
+    """Return the channel messages of a Standard MIDI File as sorted (seconds, status, data1, data2)."""
+    with open(filename, "rb") as file:
+        data = file.read()
+    if data[0:4] != b"MThd":
+        raise ValueError("Not a Standard MIDI File")
+    length, format, count, division = struct.unpack(">IHHH", data[4:14])
+
+    offset = 8 + length
+    events = [] # (tick, order, kind, values)
+    for track in range(count):
+        while data[offset:offset + 4] != b"MTrk":
+            # Skip unknown chunks
+            offset += 8 + struct.unpack(">I", data[offset + 4:offset + 8])[0]
+        end = offset + 8 + struct.unpack(">I", data[offset + 4:offset + 8])[0]
+        offset += 8
+        tick = 0
+        status = 0
+        while offset < end:
+            delta, offset = read_varlen(data, offset)
+            tick += delta
+            byte = data[offset]
+            if byte == 0xFF:
+                kind = data[offset + 1]
+                size, offset = read_varlen(data, offset + 2)
+                if kind == 0x51:
+                    events.append((tick, len(events), "tempo", (data[offset] << 16) | (data[offset + 1] << 8) | data[offset + 2]))
+                offset += size
+            elif byte == 0xF0 or byte == 0xF7:
+                size, offset = read_varlen(data, offset + 1)
+                offset += size
+            else:
+                if byte & 0x80:
+                    status = byte
+                    offset += 1
+                # Program change and channel pressure carry a single data byte
+                size = 1 if status & 0xF0 in (0xC0, 0xD0) else 2
+                values = data[offset:offset + size]
+                offset += size
+                events.append((tick, len(events), "midi", (status, values[0], values[1] if size > 1 else 0)))
+        offset = end
+
+    # Convert ticks to seconds through the tempo map
+    events.sort()
+    messages = []
+    tempo = TEMPO
+    last_tick = 0
+    seconds = 0.0
+    for tick, order, kind, value in events:
+        if division & 0x8000:
+            seconds = tick / ((256 - (division >> 8)) * (division & 0xFF))
+        else:
+            seconds += (tick - last_tick) * tempo / 1000000 / division
+        last_tick = tick
+        if kind == "tempo":
+            tempo = value
+        else:
+            messages.append((seconds,) + value)
+    return messages
+
+def read_varlen(data, offset):
+    value = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, offset
+
+class RenderVoice(MixerVoice):
+    # Same mixing as the stand-in mixer, without the simulated device
+    def play(self, sample, *, loop=False):
+        self._sample = sample
+        self._position = 0
+        self._loop = loop
+
+class RenderSample:
+    def __init__(self, data, root, renderer):
+        self.renderer = renderer
+        self.note = data["note"] if "note" in data else 0
+        self.low, self.high, self.root = pitchvariants.get_range(data)
+        self.folder = root
+        self.level = data["level"] if "level" in data else 1.0
+        self.minLevel = data["minLevel"] if "minLevel" in data else 0.0
+        curve = data["velocityCurve"] if "velocityCurve" in data and velocitycurve.is_valid(data["velocityCurve"]) else velocitycurve.CURVE_LINEAR
+        self.levels = velocitycurve.build_table(curve, self.level, self.minLevel, renderer.volume)
+        self.pan = data["pan"] if "pan" in data else 0.0
+        self.loop = data["loop"] if "loop" in data else False
+        self.stopNoteOff = data["noteOff"] if "noteOff" in data else False
+        self.maxVoices = max(1, min(MAX_VOICES, data["maxVoices"])) if "maxVoices" in data else 1
+        self.slots = [-1 for i in range(self.maxVoices)]
+        self.voice = -1
+
+        # Velocity => layer of round robin waves, voices on the host can share a wave
+        layers = samplelayers.get_layers(data)
+        self.layers = [tuple(files) for low, high, files in layers]
+        for files in self.layers:
+            for path in files:
+                if renderer.getWave(root, path) == None:
+                    raise FileNotFoundError("Sample file not found: {}".format(path))
+                for note in range(self.low, self.high + 1):
+                    renderer.getWave(root, pitchvariants.get_path(path, note - self.root))
+        self.layerTable = samplelayers.build_table(layers)
+        self.rounds = bytearray(len(self.layers))
+
+    def noteOn(self, velocity, note=-1):
+        if velocity <= 0:
+            return self.noteOff()
+        voices = self.renderer.pool
+
+        layer = self.layerTable[velocity]
+        files = self.layers[layer]
+        path = files[self.rounds[layer]]
+        self.rounds[layer] = (self.rounds[layer] + 1) % len(files)
+        wave = self.renderer.getWave(self.folder, path)
+        if note >= 0 and note != self.root:
+            # Missing variants fall back to the original pitch like on the device
+            wave = self.renderer.getWave(self.folder, pitchvariants.get_path(path, note - self.root)) or wave
+
+        slot = self.getFreeSlot()
+        if slot < 0:
+            slot = self.getOldestSlot()
+            voices.release(self.slots[slot])
+
+        i = voices.allocate(self)
+        if i < 0:
+            return -1
+        self.slots[slot] = i
+        self.voice = i
+        voice = self.renderer.voices[i]
+        voice.play(wave, loop=self.loop)
+        voice.level = self.levels[velocity]
+        voice.pan = max(-1.0, min(1.0, self.pan))
+        return i
+
+    def noteOff(self):
+        if self.stopNoteOff:
+            self.stop()
+        return True
+
+    def stop(self):
+        for i in range(len(self.slots)):
+            if self.slots[i] >= 0:
+                self.renderer.pool.release(self.slots[i])
+
+    def releaseVoice(self, voice):
+        for i in range(len(self.slots)):
+            if self.slots[i] == voice:
+                self.slots[i] = -1
+        if self.voice == voice:
+            self.voice = -1
+
+    def getFreeSlot(self):
+        for i in range(len(self.slots)):
+            if self.slots[i] < 0:
+                return i
+        return -1
+    def getOldestSlot(self):
+        slot = 0
+        for i in range(1, len(self.slots)):
+            if self.renderer.pool.get_started(self.slots[i]) < self.renderer.pool.get_started(self.slots[slot]):
+                slot = i
+        return slot
+
+class Renderer:
+    def __init__(self, config, patch=0):
+        with open(config, "r") as file:
+            data = json.load(file)
+        root = os.path.dirname(os.path.abspath(config))
+        audio = data.get("audio", {})
+        self.rate = audio.get("rate", AUDIO_RATE)
+        self.volume = audio.get("volume", AUDIO_VOLUME)
+        self.channel = data.get("midi", {}).get("channel", MIDI_CHANNEL)
+
+        self.voices = [RenderVoice(self) for i in range(MAX_VOICES)]
+        self.pool = VoicePool(self.voices, MAX_VOICES, audio.get("voiceSteal", AUDIO_VOICE_STEAL), self.releaseVoice)
+
+        self.patch = data["patches"][patch]
+        self.waves = dict()
+        self.notes = dict()
+        for sample_data in self.patch.get("samples", []):
+            if not samplelayers.get_layers(sample_data):
+                continue
+            sample = RenderSample(sample_data, root, self)
+            for note in range(sample.low, sample.high + 1):
+                if not note in self.notes:
+                    self.notes[note] = sample
+        self.log = []
+
+    def getWave(self, root, path):
+        if not path in self.waves:
+            filename = os.path.join(root, path.lstrip("/"))
+            if not os.path.exists(filename):
+                self.waves[path] = None
+                return None
+            with open(filename, "rb") as file:
+                self.waves[path] = WaveFile(file)
+            if self.waves[path].sample_rate != self.rate:
+                print("Warning: {} is {}Hz, the device requires {}Hz".format(path, self.waves[path].sample_rate, self.rate))
+        return self.waves[path]
+
+    def releaseVoice(self, voice, owner):
+        owner.releaseVoice(voice)
+
+    def handle(self, seconds, status, data1, data2):
+        kind = status & 0xF0
+        if self.channel and (status & 0x0F) != self.channel - 1:
+            return
+        if kind == 0x90 and data2 > 0:
+            if data1 in self.notes:
+                self.log.append((seconds, data1, data2, self.notes[data1].noteOn(data2, data1)))
+        elif kind == 0x80 or kind == 0x90:
+            if data1 in self.notes:
+                self.notes[data1].noteOff()
+        elif kind == 0xB0 and (data1 == CC_ALL_SOUND_OFF or data1 == CC_ALL_NOTES_OFF):
+            self.pool.release_all()
+
+    def render(self, messages):
+        # Mix every voice in one NumPy block between consecutive events
+        tail = max([len(wave.data) for wave in self.waves.values() if wave != None] + [0])
+        end = int(messages[-1][0] * self.rate) + tail if messages else 0
+        out = numpy.zeros((end, AUDIO_CHANNELS), dtype=numpy.float32)
+        position = 0
+        for message in messages:
+            frame = min(end, int(message[0] * self.rate))
+            self._mix(out[position:frame])
+            position = frame
+            self.handle(*message)
+        self._mix(out[position:])
+        return numpy.clip(out, -32768, 32767).astype(numpy.int16)
+
+    def _mix(self, block):
+        if not len(block):
+            return
+        for voice in self.voices:
+            if voice.playing:
+                voice._render(block)
+        # Finished voices go back to the pool, like Sample.update on the device
+        self.pool.reclaim()
+
+def write_wave(filename, data, rate):
+    with wave.open(filename, "wb") as writer:
+        writer.setnchannels(data.shape[1])
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+        writer.writeframes(data.tobytes())
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a MIDI file through a patch to a WAV file.")
+    parser.add_argument("midi", help="Standard MIDI File")
+    parser.add_argument("output", help="WAV file to write")
+    parser.add_argument("--config", default=os.path.join(hostenv.ROOT_DIR, "config.json"), help="config file, sample paths are relative to its folder")
+    parser.add_argument("--patch", type=int, default=0, help="index of the patch within the config")
+    parser.add_argument("--channel", type=int, default=None, help="MIDI channel, 0 for all (default from the config)")
+    parser.add_argument("--log", default=None, help="write the voice allocation of every note to this file")
+    args = parser.parse_args()
+
+    renderer = Renderer(args.config, args.patch)
+    if args.channel != None:
+        renderer.channel = args.channel
+    messages = read_smf(args.midi)
+    data = renderer.render(messages)
+    write_wave(args.output, data, renderer.rate)
+
+    if args.log:
+        with open(args.log, "w") as file:
+            for seconds, note, velocity, voice in renderer.log:
+                file.write("{:.6f} {} {} {}\n".format(seconds, note, velocity, voice))
+
+    dropped = len([entry for entry in renderer.log if entry[3] < 0])
+    print("Rendered: {:.1f}s, {} notes, {} dropped".format(len(data) / renderer.rate, len(renderer.log), dropped))
+
+if __name__ == "__main__":
+    main()
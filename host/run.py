@@ -0,0 +1,210 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: run.py
+Title: Host Runner
+Version: 0.1.0
+Since: 0.1.0
+
+Runs the unmodified code.py under CPython against the stand-ins in
+host/standins and reports loop throughput and MIDI-to-voice latency.
+
+    python host/run.py --seconds 10 --roll 36,38,42 --rate 20
+    python host/run.py --script fill.txt --key 2.0:12:0.1 --record out.wav
+
+Script files contain one message per line: a time in seconds followed by
+the message bytes in hex, ie: "0.500 99 24 7f".
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import time
+import wave
+
+import hostenv
+
+def parse_script(device, filename):
+    with open(filename, "r") as file:
+        for line in file:
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            device.midi.add(int(float(parts[0]) * 1000000000), bytes(int(part, 16) for part in parts[1:]))
+
+def add_roll(device, notes, rate, channel, start, seconds, velocity=100):
+    # Alternating note on/off pairs at a fixed rate, like a dense drum roll
+    status = 0x90 | ((channel - 1) & 0x0F)
+    count = int(seconds * rate)
+    for i in range(count):
+        ns = int((start + i / rate) * 1000000000)
+        note = notes[i % len(notes)]
+        device.midi.add(ns, bytes([status, note, velocity]))
+        device.midi.add(ns, bytes([status, note, 0]))
+    return count
+
+def add_key(device, value):
+    parts = value.split(":")
+    ns = int(float(parts[0]) * 1000000000)
+    key = int(parts[1])
+    duration = float(parts[2]) if len(parts) > 2 else 0.1
+    device.keys.add(ns, key, True)
+    device.keys.add(ns + int(duration * 1000000000), key, False)
+
+def add_turn(device, value):
+    parts = value.split(":")
+    device.controls.add_turn(int(float(parts[0]) * 1000000000), int(parts[1]))
+
+def add_press(device, value):
+    parts = value.split(":")
+    ns = int(float(parts[0]) * 1000000000)
+    duration = float(parts[1]) if len(parts) > 1 else 0.1
+    device.controls.add_press(ns, True)
+    device.controls.add_press(ns + int(duration * 1000000000), False)
+
+def write_recording(device, filename):
+    import numpy
+    for mixer in device.mixers:
+        if mixer.output == None:
+            continue
+        data = numpy.concatenate(mixer.output) if mixer.output else numpy.zeros((0, mixer.channel_count), dtype=numpy.int16)
+        with wave.open(filename, "wb") as writer:
+            writer.setnchannels(mixer.channel_count)
+            writer.setsampwidth(2)
+            writer.setframerate(mixer.sample_rate)
+            writer.writeframes(data.tobytes())
+        return True
+    return False
+
+def task_summary(namespace):
+    if not namespace or not "scheduler" in namespace:
+        return None
+    tasks = dict()
+    for task in namespace["scheduler"]:
+        tasks[task.get_name()] = {
+            "period_ms": task.get_period() * 1000,
+            "runs": task.runs,
+            "monitored": task.monitor, # Intervals and durations are only timed with the report task or profiler
+            "max_interval_ms": task.max_interval / 1000000,
+            "max_duration_ms": task.max_duration / 1000000,
+            "worst_latency_ms": task.get_worst_latency() * 1000,
+        }
+    return tasks
+
+def trellis_summary(namespace, looping):
+    if not namespace or not "trellis" in namespace:
+        return None
+    seesaw = namespace["trellis"].seesaw
+    return {
+        "writes": seesaw.writes,
+        "bytes": seesaw.bytes_written,
+        "writes_per_s": seesaw.writes / looping if looping else 0,
+    }
+
+def menu_summary(namespace):
+    if not namespace or not "display_menu" in namespace:
+        return None
+    menu = namespace["display_menu"]
+    return {
+        "refreshes": menu.refreshes,
+        "max_render_ms": menu.max_render_time / 1000000,
+        "max_refresh_ms": menu.max_refresh_time / 1000000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run code.py on the host with hardware stand-ins.")
+    parser.add_argument("--root", default=hostenv.ROOT_DIR, help="CIRCUITPY directory containing code.py")
+    parser.add_argument("--file", default="code.py", help="script to run relative to the root, ie: tests/midiparse-test.py")
+    parser.add_argument("--sd", default=None, help="directory to mount as the SD card")
+    parser.add_argument("--seconds", type=float, default=10.0, help="simulated seconds to run")
+    parser.add_argument("--boot", type=float, default=5.0, help="simulated seconds to allow for boot before MIDI starts")
+    parser.add_argument("--script", default=None, help="timed MIDI script file")
+    parser.add_argument("--roll", default=None, help="comma separated notes for a generated drum roll")
+    parser.add_argument("--rate", type=float, default=16.0, help="drum roll hits per second")
+    parser.add_argument("--channel", type=int, default=10, help="MIDI channel of generated messages")
+    parser.add_argument("--key", action="append", default=[], help="pad press as time:pad[:duration]")
+    parser.add_argument("--turn", action="append", default=[], help="menu encoder turn as time:steps")
+    parser.add_argument("--press", action="append", default=[], help="menu button press as time[:duration]")
+    parser.add_argument("--record", default=None, help="write the mixer output to a WAV file")
+    parser.add_argument("--cpu-scale", type=float, default=0.0, help="charge host CPU time to the device clock multiplied by this factor")
+    parser.add_argument("--loop-us", type=float, default=hostenv.LOOP_NS / 1000, help="simulated cost of each asyncio event loop pass")
+    parser.add_argument("--trace-memory", action="store_true", help="report gc.mem_alloc using tracemalloc")
+    parser.add_argument("--quiet", action="store_true", help="hide the firmware's serial output")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    device = hostenv.Device(args.root, args.sd, args.cpu_scale, int(args.loop_us * 1000), args.trace_memory)
+
+    if args.script:
+        parse_script(device, args.script)
+    if args.roll:
+        add_roll(device, [int(note) for note in args.roll.split(",")], args.rate, args.channel, args.boot, args.seconds - args.boot)
+    for key in args.key:
+        add_key(device, key)
+    for turn in args.turn:
+        add_turn(device, turn)
+    for press in args.press:
+        add_press(device, press)
+
+    device.record = args.record != None
+    device.install()
+
+    start = time.perf_counter()
+    if args.quiet:
+        with contextlib.redirect_stdout(io.StringIO()):
+            device.run(args.seconds, args.file)
+    else:
+        device.run(args.seconds, args.file)
+    elapsed = time.perf_counter() - start
+
+    if args.record:
+        write_recording(device, args.record)
+
+    stats = device.stats
+    looping = (device.clock.ns - stats.first_iteration) / 1000000000 if stats.first_iteration != None else 0
+    report = {
+        "simulated_s": device.clock.ns / 1000000000,
+        "wall_s": elapsed,
+        "iterations": stats.iterations,
+        "boot_s": stats.first_iteration / 1000000000 if stats.first_iteration != None else None,
+        "iterations_per_s": stats.iterations / looping if looping else 0,
+        "wall_us_per_iteration": elapsed / stats.iterations * 1000000 if stats.iterations else 0,
+        "notes_received": stats.notes_received,
+        "notes_played": stats.notes_played,
+        "midi_unread": device.midi.remaining(),
+        "latency": stats.latency_summary(),
+        "tasks": task_summary(device.namespace),
+        "trellis": trellis_summary(device.namespace, looping),
+        "menu": menu_summary(device.namespace),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=4))
+        return
+
+    print("\n:: Host Run ::")
+    print("Simulated: {:.3f}s, Wall: {:.3f}s".format(report["simulated_s"], report["wall_s"]))
+    if report["boot_s"] != None:
+        print("Boot: {:.3f}s".format(report["boot_s"]))
+    print("Loop: {} iterations, {:.1f}/s simulated, {:.1f}us wall each".format(report["iterations"], report["iterations_per_s"], report["wall_us_per_iteration"]))
+    print("Notes: {} received, {} played, {} bytes unread".format(report["notes_received"], report["notes_played"], report["midi_unread"]))
+    latency = report["latency"]
+    if latency:
+        print("Latency (ms): min {min_ms:.3f}, mean {mean_ms:.3f}, p50 {p50_ms:.3f}, p95 {p95_ms:.3f}, p99 {p99_ms:.3f}, max {max_ms:.3f}".format(**latency))
+    if report["trellis"]:
+        print("Trellis: {writes} I2C writes, {bytes} bytes, {writes_per_s:.1f} writes/s".format(**report["trellis"]))
+    if report["menu"]:
+        print("Menu: {refreshes} refreshes, max render {max_render_ms:.3f}ms, max refresh {max_refresh_ms:.3f}ms".format(**report["menu"]))
+    if report["tasks"]:
+        for name, task in report["tasks"].items():
+            if task["monitored"]:
+                print("Task {}: {} runs, period {:.1f}ms, max interval {:.3f}ms, max duration {:.3f}ms".format(name, task["runs"], task["period_ms"], task["max_interval_ms"], task["max_duration_ms"]))
+            else:
+                print("Task {}: {} runs, period {:.1f}ms, not timed".format(name, task["runs"], task["period_ms"]))
+
+if __name__ == "__main__":
+    main()
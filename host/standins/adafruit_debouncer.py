@@ -0,0 +1,27 @@
+"""
+Host stand-in for the adafruit_debouncer library.
+"""
+
+class Debouncer:
+    def __init__(self, io, interval=0.010):
+        self._io = io
+        self.interval = interval
+        self._value = self._read()
+        self._last = self._value
+        self.rose = False
+        self.fell = False
+
+    def _read(self):
+        if callable(self._io):
+            return bool(self._io())
+        return bool(self._io.value)
+
+    @property
+    def value(self):
+        return self._value
+
+    def update(self):
+        self._last = self._value
+        self._value = self._read()
+        self.rose = self._value and not self._last
+        self.fell = self._last and not self._value
@@ -0,0 +1,69 @@
+"""
+Host stand-in for the adafruit_midi library. Like the original it reads
+the UART into a bytearray and allocates a message object for every
+complete message it parses.
+"""
+
+from adafruit_midi.midi_message import MIDIMessage, MIDIUnknownEvent
+from adafruit_midi.note_on import NoteOn
+from adafruit_midi.note_off import NoteOff
+from adafruit_midi.program_change import ProgramChange
+from adafruit_midi.control_change import ControlChange
+
+_MESSAGES = {
+    0x80: (NoteOff, 2),
+    0x90: (NoteOn, 2),
+    0xA0: (None, 2),
+    0xB0: (ControlChange, 2),
+    0xC0: (ProgramChange, 1),
+    0xD0: (None, 1),
+    0xE0: (None, 2),
+}
+
+class MIDI:
+    def __init__(self, midi_in=None, midi_out=None, *, in_channel=None, out_channel=0, in_buf_size=30, debug=False):
+        self._midi_in = midi_in
+        self._midi_out = midi_out
+        self.in_channel = in_channel
+        self.out_channel = out_channel
+        self._in_buf_size = in_buf_size
+        self._in_buf = bytearray(0)
+        self._debug = debug
+
+    def receive(self):
+        bytes_in = self._midi_in.read(self._in_buf_size - len(self._in_buf))
+        if bytes_in:
+            self._in_buf.extend(bytes_in)
+
+        while self._in_buf:
+            status = self._in_buf[0]
+            if status < 0x80 or status >= 0xF0:
+                # Stray data or system messages are skipped
+                self._in_buf = self._in_buf[1:]
+                continue
+            cls, length = _MESSAGES[status & 0xF0]
+            if len(self._in_buf) < length + 1:
+                return None
+            data = self._in_buf[1:length + 1]
+            self._in_buf = self._in_buf[length + 1:]
+            channel = status & 0x0F
+            if self.in_channel != None and channel != self.in_channel:
+                continue
+            if cls == None:
+                return MIDIUnknownEvent(status)
+            message = cls(*data, channel=channel)
+            if cls == NoteOn and message.velocity == 0:
+                message = NoteOff(message.note, 0, channel=channel)
+            return message
+        return None
+
+    def send(self, msg, channel=None):
+        if channel == None:
+            channel = self.out_channel
+        if isinstance(msg, MIDIMessage):
+            data = msg.__bytes__(channel)
+        else:
+            data = bytearray()
+            for message in msg:
+                data.extend(message.__bytes__(channel))
+        self._midi_out.write(data)
@@ -0,0 +1,16 @@
+"""
+Host stand-in for adafruit_midi.control_change.
+"""
+
+from adafruit_midi.midi_message import MIDIMessage
+
+class ControlChange(MIDIMessage):
+    _STATUS = 0xB0
+
+    def __init__(self, control, value, *, channel=None):
+        super().__init__(channel=channel)
+        self.control = control
+        self.value = value
+
+    def _data(self):
+        return [self.control, self.value]
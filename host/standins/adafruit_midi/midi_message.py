@@ -0,0 +1,22 @@
+"""
+Host stand-in for adafruit_midi.midi_message.
+"""
+
+class MIDIMessage:
+    _STATUS = 0x00
+
+    def __init__(self, *, channel=None):
+        self.channel = channel
+
+    def _data(self):
+        return []
+
+    def __bytes__(self, channel=None):
+        if channel == None:
+            channel = self.channel or 0
+        return bytes([self._STATUS | (channel & 0x0F)] + self._data())
+
+class MIDIUnknownEvent(MIDIMessage):
+    def __init__(self, status):
+        super().__init__()
+        self.status = status
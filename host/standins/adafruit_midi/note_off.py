@@ -0,0 +1,16 @@
+"""
+Host stand-in for adafruit_midi.note_off.
+"""
+
+from adafruit_midi.midi_message import MIDIMessage
+
+class NoteOff(MIDIMessage):
+    _STATUS = 0x80
+
+    def __init__(self, note, velocity=0, *, channel=None):
+        super().__init__(channel=channel)
+        self.note = note
+        self.velocity = velocity
+
+    def _data(self):
+        return [self.note, self.velocity]
@@ -0,0 +1,16 @@
+"""
+Host stand-in for adafruit_midi.note_on.
+"""
+
+from adafruit_midi.midi_message import MIDIMessage
+
+class NoteOn(MIDIMessage):
+    _STATUS = 0x90
+
+    def __init__(self, note, velocity=127, *, channel=None):
+        super().__init__(channel=channel)
+        self.note = note
+        self.velocity = velocity
+
+    def _data(self):
+        return [self.note, self.velocity]
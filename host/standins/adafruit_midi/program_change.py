@@ -0,0 +1,15 @@
+"""
+Host stand-in for adafruit_midi.program_change.
+"""
+
+from adafruit_midi.midi_message import MIDIMessage
+
+class ProgramChange(MIDIMessage):
+    _STATUS = 0xC0
+
+    def __init__(self, patch, *, channel=None):
+        super().__init__(channel=channel)
+        self.patch = patch
+
+    def _data(self):
+        return [self.patch]
@@ -0,0 +1,96 @@
+"""
+Host stand-in for adafruit_neotrellis.neotrellis. Key presses come from the
+scripted key source of the simulated device and pixel writes are counted
+as I2C transactions from the first pass of the main loop.
+"""
+
+import hostenv
+
+_NEO_TRELLIS_NUM_KEYS = 16
+
+class TrellisEvent:
+    def __init__(self, number, edge):
+        self.number = number
+        self.edge = edge
+
+class FakeSeesaw:
+    def __init__(self):
+        self.writes = 0
+        self.bytes_written = 0
+
+    def write(self, reg_base, reg, buf=None):
+        self.writes += 1
+        self.bytes_written += 2 + (len(buf) if buf else 0)
+
+class NeoPixel:
+    def __init__(self, seesaw, n, bpp=3, brightness=1.0, auto_write=True):
+        self._seesaw = seesaw
+        self.n = n
+        self.bpp = bpp
+        self.brightness = brightness
+        self.auto_write = auto_write
+        self._pixels = [(0, 0, 0) for i in range(n)]
+
+    def __len__(self):
+        return self.n
+    def __getitem__(self, index):
+        return self._pixels[index]
+    def __setitem__(self, index, color):
+        if isinstance(color, int):
+            color = ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF)
+        self._pixels[index] = tuple(color)
+        self._seesaw.write(0x0E, 0x04, bytearray(2 + self.bpp))
+        if self.auto_write:
+            self.show()
+
+    def fill(self, color):
+        for i in range(self.n):
+            self._pixels[i] = tuple(color)
+        self._seesaw.write(0x0E, 0x04, bytearray(2 + self.bpp * self.n))
+        if self.auto_write:
+            self.show()
+
+    def show(self):
+        self._seesaw.write(0x0E, 0x05)
+
+class NeoTrellis:
+    EDGE_HIGH = 0
+    EDGE_LOW = 1
+    EDGE_FALLING = 2
+    EDGE_RISING = 3
+
+    def __init__(self, i2c_bus, interrupt=False, addr=0x2E, drdy=None):
+        self.i2c_bus = i2c_bus
+        self.interrupt_enabled = interrupt
+        self.callbacks = [None for i in range(_NEO_TRELLIS_NUM_KEYS)]
+        self.seesaw = FakeSeesaw()
+        self.pixels = NeoPixel(self.seesaw, _NEO_TRELLIS_NUM_KEYS)
+        self._active = set()
+        self.syncs = 0
+
+    def write(self, reg_base, reg, buf=None):
+        self.seesaw.write(reg_base, reg, buf)
+
+    def activate_key(self, key, edge, enable=True):
+        if enable:
+            self._active.add((key, edge))
+        else:
+            self._active.discard((key, edge))
+
+    def sync(self):
+        device = hostenv.device
+        self.syncs += 1
+        device.stats.iterations += 1
+        if device.stats.first_iteration == None:
+            device.stats.first_iteration = device.clock.ns
+            # Only count pixel writes made by the main loop
+            self.seesaw.writes = 0
+            self.seesaw.bytes_written = 0
+        device.stats.flush()
+        if device.stop_on_sync:
+            raise hostenv.HostExit()
+
+        for ns, key, pressed in device.keys.pop(device.clock.now()):
+            edge = self.EDGE_RISING if pressed else self.EDGE_FALLING
+            if (key, edge) in self._active and self.callbacks[key] != None:
+                self.callbacks[key](TrellisEvent(key, edge))
@@ -0,0 +1,18 @@
+"""
+Host stand-in for the CircuitPython audiobusio module.
+"""
+
+class I2SOut:
+    def __init__(self, bit_clock, word_select, data, left_justified=False):
+        self.playing = False
+        self.sample = None
+
+    def play(self, sample, loop=False):
+        self.sample = sample
+        self.playing = True
+
+    def stop(self):
+        self.playing = False
+
+    def deinit(self):
+        self.stop()
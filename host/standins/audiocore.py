@@ -0,0 +1,54 @@
+"""
+Host stand-in for the CircuitPython audiocore module. Samples are decoded
+into NumPy arrays of shape (frames, channels) for the stand-in mixer.
+"""
+
+import wave
+
+import numpy
+
+class WaveFile:
+    def __init__(self, file, buffer=None):
+        # The device only takes buffers of 8 to 1024 bytes
+        if buffer != None and not 8 <= len(buffer) <= 1024:
+            raise ValueError("buffer must be 8-1024 bytes")
+        self.file = file
+        self.buffer = buffer
+        file.seek(0)
+        with wave.open(file, "rb") as reader:
+            self.channel_count = reader.getnchannels()
+            self.sample_rate = reader.getframerate()
+            self.bits_per_sample = reader.getsampwidth() * 8
+            frames = reader.readframes(reader.getnframes())
+        self.samples_signed = self.bits_per_sample != 8
+        if self.bits_per_sample == 8:
+            data = (numpy.frombuffer(frames, dtype=numpy.uint8).astype(numpy.int16) - 128) << 8
+        else:
+            data = numpy.frombuffer(frames, dtype=numpy.int16)
+        self.data = data.reshape(-1, self.channel_count)
+
+    def deinit(self):
+        self.data = None
+
+class RawSample:
+    def __init__(self, buffer, *, channel_count=1, sample_rate=8000):
+        self.channel_count = channel_count
+        self.sample_rate = sample_rate
+        self.bits_per_sample = 16
+
+        view = memoryview(buffer)
+        self.samples_signed = view.format in ("h", "b")
+        if view.format == "h":
+            data = numpy.frombuffer(view, dtype=numpy.int16)
+        elif view.format == "H":
+            data = (numpy.frombuffer(view, dtype=numpy.uint16).astype(numpy.int32) - 32768).astype(numpy.int16)
+        elif view.format == "b":
+            data = numpy.frombuffer(view, dtype=numpy.int8).astype(numpy.int16) << 8
+            self.bits_per_sample = 8
+        else:
+            data = (numpy.frombuffer(view, dtype=numpy.uint8).astype(numpy.int16) - 128) << 8
+            self.bits_per_sample = 8
+        self.data = data.reshape(-1, channel_count)
+
+    def deinit(self):
+        self.data = None
@@ -0,0 +1,105 @@
+"""
+Host stand-in for the CircuitPython audiomixer module. Voices are mixed with
+NumPy in buffer_size blocks as the simulated clock advances.
+"""
+
+import numpy
+
+import hostenv
+
+class MixerVoice:
+    def __init__(self, mixer):
+        self._mixer = mixer
+        self._sample = None
+        self._position = 0
+        self._loop = False
+        self.level = 1.0
+        self.pan = 0.0
+
+    @property
+    def playing(self):
+        return self._sample != None
+
+    def play(self, sample, *, loop=False):
+        # The device mixes without converting, any difference in format is refused
+        mixer = self._mixer
+        for name, value in (("sample_rate", mixer.sample_rate), ("channel_count", mixer.channel_count), ("bits_per_sample", mixer.bits_per_sample), ("samples_signed", mixer.samples_signed)):
+            if getattr(sample, name) != value:
+                raise ValueError("The sample's {} does not match".format(name))
+        self._sample = sample
+        self._position = 0
+        self._loop = loop
+        self._mixer.plays += 1
+        hostenv.device.stats.voice_played(hostenv.device.clock.now())
+
+    def stop(self):
+        self._sample = None
+        self._position = 0
+
+    def _render(self, out):
+        frames = len(out)
+        data = self._sample.data
+        if data is None:
+            self.stop()
+            return
+        if self._loop:
+            index = (numpy.arange(frames) + self._position) % len(data)
+            chunk = data[index]
+            self._position = (self._position + frames) % len(data)
+        else:
+            chunk = data[self._position:self._position + frames]
+            self._position += len(chunk)
+            if self._position >= len(data):
+                self.stop()
+        if not len(chunk):
+            return
+
+        chunk = chunk.astype(numpy.float32) * self.level
+        if out.shape[1] == 2:
+            if chunk.shape[1] == 1:
+                chunk = numpy.repeat(chunk, 2, axis=1)
+            pan = max(-1.0, min(1.0, self.pan))
+            chunk[:, 0] *= min(1.0, 1.0 - pan)
+            chunk[:, 1] *= min(1.0, 1.0 + pan)
+        elif chunk.shape[1] == 2:
+            chunk = chunk.mean(axis=1, keepdims=True)
+        out[:len(chunk)] += chunk
+
+class Mixer:
+    def __init__(self, voice_count=2, buffer_size=1024, channel_count=2, bits_per_sample=16, samples_signed=True, sample_rate=8000):
+        self.voice_count = voice_count
+        self.buffer_size = buffer_size
+        self.channel_count = channel_count
+        self.bits_per_sample = bits_per_sample
+        self.samples_signed = samples_signed
+        self.sample_rate = sample_rate
+        self.voice = tuple(MixerVoice(self) for i in range(voice_count))
+        self.plays = 0
+        self.output = [] if hostenv.device.record else None
+
+        self._rendered = hostenv.device.clock.ns * sample_rate // 1000000000
+        hostenv.device.mixers.append(self)
+
+    @property
+    def playing(self):
+        return any(voice.playing for voice in self.voice)
+
+    def advance(self, now):
+        target = now * self.sample_rate // 1000000000
+        while self._rendered + self.buffer_size <= target:
+            self._rendered += self.buffer_size
+            block = numpy.zeros((self.buffer_size, self.channel_count), dtype=numpy.float32)
+            for voice in self.voice:
+                if voice.playing:
+                    voice._render(block)
+            if self.output != None:
+                self.output.append(numpy.clip(block, -32768, 32767).astype(numpy.int16))
+
+    def play(self, sample, *, voice=0, loop=False):
+        self.voice[voice].play(sample, loop=loop)
+
+    def stop_voice(self, voice=0):
+        self.voice[voice].stop()
+
+    def deinit(self):
+        hostenv.device.mixers.remove(self)
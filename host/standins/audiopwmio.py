@@ -0,0 +1,18 @@
+"""
+Host stand-in for the CircuitPython audiopwmio module.
+"""
+
+class PWMAudioOut:
+    def __init__(self, left_channel, right_channel=None, quiescent_value=0x8000):
+        self.playing = False
+        self.sample = None
+
+    def play(self, sample, loop=False):
+        self.sample = sample
+        self.playing = True
+
+    def stop(self):
+        self.playing = False
+
+    def deinit(self):
+        self.stop()
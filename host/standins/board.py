@@ -0,0 +1,18 @@
+"""
+Host stand-in for the CircuitPython board module (Raspberry Pi Pico).
+"""
+
+class Pin:
+    def __init__(self, name):
+        self.name = name
+    def __repr__(self):
+        return "board." + self.name
+
+LED = Pin("LED")
+VBUS_SENSE = Pin("VBUS_SENSE")
+SMPS_MODE = Pin("SMPS_MODE")
+VOLTAGE_MONITOR = Pin("VOLTAGE_MONITOR")
+
+for _i in range(29):
+    globals()["GP" + str(_i)] = Pin("GP" + str(_i))
+del _i
@@ -0,0 +1,93 @@
+"""
+Host stand-in for the CircuitPython busio module. The UART reads from the
+scripted MIDI source of the simulated device.
+"""
+
+import hostenv
+
+class I2C:
+    def __init__(self, scl, sda, frequency=100000, timeout=255):
+        self.scl = scl
+        self.sda = sda
+        self.frequency = frequency
+
+    def try_lock(self):
+        return True
+    def unlock(self):
+        pass
+    def deinit(self):
+        pass
+
+class SPI:
+    def __init__(self, clock, MOSI=None, MISO=None):
+        self.clock = clock
+        self.MOSI = MOSI
+        self.MISO = MISO
+
+    def deinit(self):
+        pass
+
+class UART:
+    def __init__(self, tx=None, rx=None, baudrate=9600, bits=8, parity=None, stop=1, timeout=1, receiver_buffer_size=64):
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self._status = 0
+        self._data = []
+
+    @property
+    def in_waiting(self):
+        device = hostenv.device
+        return device.midi.available(device.clock.now())
+
+    def _drain(self, count):
+        device = hostenv.device
+        now = device.clock.now()
+        if device.midi.available(now) < count and self.timeout > 0:
+            # Block like the hardware until the timeout passes
+            device.clock.advance(self.timeout * 1000000000)
+            now = device.clock.now()
+        data = device.midi.read(now, count)
+        for arrival, byte in data:
+            self._track(arrival, byte)
+        return bytes([byte for arrival, byte in data])
+
+    def _track(self, arrival, byte):
+        # Follow note on messages (including running status) for latency statistics
+        if byte & 0x80:
+            if byte < 0xF8:
+                self._status = byte if byte < 0xF0 else 0
+                self._data = []
+            return
+        if not self._status:
+            return
+        self._data.append(byte)
+        if self._status & 0xF0 in (0xC0, 0xD0):
+            self._data = []
+        elif len(self._data) == 2:
+            if self._status & 0xF0 == 0x90 and self._data[1] > 0:
+                device = hostenv.device
+                device.stats.note_drained(arrival, device.is_mapped(self._data[0]))
+            self._data = []
+
+    def read(self, nbytes=None):
+        data = self._drain(nbytes if nbytes != None else 64)
+        if not data:
+            return None
+        return data
+
+    def readinto(self, buf):
+        data = self._drain(len(buf))
+        if not data:
+            return None
+        buf[0:len(data)] = data
+        return len(data)
+
+    def write(self, buf):
+        hostenv.device.stats.bytes_out.extend(buf)
+        return len(buf)
+
+    def reset_input_buffer(self):
+        pass
+
+    def deinit(self):
+        pass
@@ -0,0 +1,48 @@
+"""
+Host stand-in for the CircuitPython digitalio module. The menu button pin
+reads the scripted button presses of the simulated device.
+"""
+
+import hostenv
+
+class Direction:
+    INPUT = "input"
+    OUTPUT = "output"
+
+class Pull:
+    UP = "up"
+    DOWN = "down"
+
+class DriveMode:
+    PUSH_PULL = "push_pull"
+    OPEN_DRAIN = "open_drain"
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.pin = pin
+        self.direction = Direction.INPUT
+        self._pull = None
+        self._value = False
+
+    @property
+    def pull(self):
+        return self._pull
+    @pull.setter
+    def pull(self, value):
+        self._pull = value
+        # Buttons idle high with a pull up
+        self._value = value == Pull.UP
+
+    @property
+    def value(self):
+        device = hostenv.device
+        if device != None and self.direction == Direction.INPUT and getattr(self.pin, "name", None) == hostenv.BUTTON_PIN:
+            # Pressing pulls the input low
+            return not device.controls.is_pressed(device.clock.now())
+        return self._value
+    @value.setter
+    def value(self, value):
+        self._value = bool(value)
+
+    def deinit(self):
+        pass
@@ -0,0 +1,157 @@
+"""
+Host stand-in for the CircuitPython displayio module. Nothing is drawn,
+the objects only keep the attributes the firmware reads back. Each refresh
+compares every drawable with the previous refresh, like displayio's dirty
+areas, and charges the simulated clock for sending the changed rows over
+the display bus.
+"""
+
+import hostenv
+
+TEXT_HEIGHT = 12 # terminalio.FONT glyph height
+
+def release_displays():
+    pass
+
+class Group:
+    def __init__(self, *, scale=1, x=0, y=0):
+        self.scale = scale
+        self.x = x
+        self.y = y
+        self.hidden = False
+        self._items = []
+
+    def append(self, item):
+        self._items.append(item)
+    def insert(self, index, item):
+        self._items.insert(index, item)
+    def remove(self, item):
+        self._items.remove(item)
+    def pop(self, i=-1):
+        return self._items.pop(i)
+    def index(self, item):
+        return self._items.index(item)
+    def __len__(self):
+        return len(self._items)
+    def __getitem__(self, index):
+        return self._items[index]
+    def __setitem__(self, index, value):
+        self._items[index] = value
+    def __delitem__(self, index):
+        del self._items[index]
+
+class Bitmap:
+    def __init__(self, width, height, value_count):
+        self.width = width
+        self.height = height
+        self._pixels = bytearray(width * height)
+
+    def __getitem__(self, index):
+        return self._pixels[index]
+    def __setitem__(self, index, value):
+        self._pixels[index] = value
+    def fill(self, value):
+        for i in range(len(self._pixels)):
+            self._pixels[i] = value
+
+class Palette:
+    def __init__(self, color_count):
+        self._colors = [0 for i in range(color_count)]
+
+    def __len__(self):
+        return len(self._colors)
+    def __getitem__(self, index):
+        return self._colors[index]
+    def __setitem__(self, index, value):
+        self._colors[index] = value
+
+class ColorConverter:
+    pass
+
+class TileGrid:
+    def __init__(self, bitmap, *, pixel_shader, width=1, height=1, tile_width=None, tile_height=None, default_tile=0, x=0, y=0):
+        self.bitmap = bitmap
+        self.pixel_shader = pixel_shader
+        self.x = x
+        self.y = y
+        self.hidden = False
+
+class OnDiskBitmap:
+    def __init__(self, file):
+        self.file = file
+        self.pixel_shader = ColorConverter()
+        self.width = 128
+        self.height = 64
+
+class I2CDisplay:
+    def __init__(self, i2c_bus, *, device_address, reset=None):
+        self.i2c_bus = i2c_bus
+        self.device_address = device_address
+
+class Display:
+    def __init__(self, display_bus, init_sequence=None, *, width, height, **kwargs):
+        self.bus = display_bus
+        self.width = width
+        self.height = height
+        self.root_group = None
+        self.auto_refresh = True
+        self.refreshes = 0
+        self.bytes_sent = 0
+        self._last_refresh = None
+        self._drawn = dict()
+
+    def show(self, group):
+        self.root_group = group
+
+    def refresh(self, *, target_frames_per_second=None, minimum_frames_per_second=0):
+        now = hostenv.device.clock.now()
+        if target_frames_per_second and self._last_refresh != None and now - self._last_refresh < 1000000000 // target_frames_per_second:
+            return False
+        self._last_refresh = now
+        self.refreshes += 1
+
+        top, bottom = self._dirty_rows()
+        if bottom <= top:
+            return True
+        # 1 bit per pixel in pages of 8 rows
+        size = self.width * ((bottom + 7) // 8 - top // 8)
+        self.bytes_sent += size
+        frequency = getattr(getattr(self.bus, "i2c_bus", None), "frequency", 0)
+        if frequency:
+            # 9 clocks per byte including the acknowledge
+            hostenv.device.clock.advance(size * 9 * 1000000000 // frequency)
+        return True
+
+    def _dirty_rows(self):
+        drawn = dict()
+        if self.root_group != None:
+            _collect(self.root_group, 0, 0, False, drawn)
+        top = self.height
+        bottom = 0
+        for key in set(drawn.keys()) | set(self._drawn.keys()):
+            current = drawn.get(key)
+            previous = self._drawn.get(key)
+            if current == previous:
+                continue
+            for state in (current, previous):
+                if state != None and not state[0]:
+                    top = min(top, max(0, state[1]))
+                    bottom = max(bottom, min(self.height, state[2]))
+        self._drawn = drawn
+        return top, bottom
+
+def _collect(group, x, y, hidden, drawn):
+    # Records (hidden, top, bottom, appearance) of every drawable by identity
+    x += group.x
+    y += group.y
+    hidden = hidden or group.hidden
+    for item in group._items:
+        if isinstance(item, Group):
+            _collect(item, x, y, hidden, drawn)
+        elif isinstance(item, TileGrid):
+            palette = tuple(item.pixel_shader._colors) if isinstance(item.pixel_shader, Palette) else None
+            drawn[id(item)] = (hidden or item.hidden, y + item.y, y + item.y + item.bitmap.height, (x + item.x, palette))
+        else:
+            position = item.anchored_position if getattr(item, "anchored_position", None) != None else (item.x, item.y)
+            middle = y + int(position[1])
+            drawn[id(item)] = (hidden or item.hidden, middle - TEXT_HEIGHT // 2, middle + TEXT_HEIGHT // 2, (x + int(position[0]), getattr(item, "text", None), getattr(item, "color", None)))
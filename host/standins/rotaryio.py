@@ -0,0 +1,22 @@
+"""
+Host stand-in for the CircuitPython rotaryio module. The position follows
+the scripted encoder turns of the simulated device.
+"""
+
+import hostenv
+
+class IncrementalEncoder:
+    def __init__(self, pin_a, pin_b, divisor=4):
+        self.pin_a = pin_a
+        self.pin_b = pin_b
+        self.divisor = divisor
+
+    @property
+    def position(self):
+        device = hostenv.device
+        if device == None:
+            return 0
+        return device.controls.get_position(device.clock.now())
+
+    def deinit(self):
+        pass
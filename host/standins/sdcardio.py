@@ -0,0 +1,15 @@
+"""
+Host stand-in for the CircuitPython sdcardio module. A card is only
+present when the simulated device was given an SD directory.
+"""
+
+import hostenv
+
+class SDCard:
+    def __init__(self, bus, cs, baudrate=8000000):
+        if not hostenv.device.sd:
+            raise OSError("no SD card")
+        self.directory = hostenv.device.sd
+
+    def deinit(self):
+        pass
@@ -0,0 +1,18 @@
+"""
+Host stand-in for the CircuitPython storage module.
+"""
+
+import hostenv
+
+class VfsFat:
+    def __init__(self, block_device):
+        self.directory = block_device.directory
+
+def mount(filesystem, mount_path, readonly=False):
+    hostenv.device.mount(mount_path, filesystem.directory)
+
+def umount(mount):
+    hostenv.device.mounts.pop(mount.rstrip("/"), None)
+
+def remount(mount_path, readonly=False, disable_concurrent_write_protection=False):
+    pass
@@ -0,0 +1,3 @@
+"""
+Host stand-in for the CircuitPython ulab module, backed by NumPy.
+"""
@@ -0,0 +1,5 @@
+"""
+Host stand-in for ulab.numpy, the parts of NumPy it shares are NumPy's own.
+"""
+
+from numpy import int8, int16, uint8, uint16, zeros, ones, array, frombuffer
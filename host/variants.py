@@ -0,0 +1,94 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: variants.py
+Title: Pitch Variant Renderer
+Version: 0.1.0
+Since: 0.1.0
+
+Renders a pitched copy of every file of each sample with a "range" in one
+or more config files, one per note of the range other than the root. The
+copies are resampled like a sampler would play them, shorter going up and
+longer going down, so the device only has to pick the right file.
+
+    python host/variants.py
+    python host/variants.py config.json /media/sd/config.json --jobs 4
+    python host/variants.py --force
+
+Copies are written next to each original, named by lib/pitchvariants.py,
+and only rendered again when the original is newer.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import wave
+
+import hostenv
+sys.path.insert(0, os.path.join(hostenv.ROOT_DIR, "lib"))
+
+import condition
+import pitchvariants
+import samplelayers
+
+def get_jobs(configs, force=False):
+    """Return (original, variant, offset) for every variant of the configs which needs rendering."""
+    jobs = []
+    for filename in configs:
+        with open(filename, "r") as file:
+            data = json.load(file)
+        root = os.path.dirname(os.path.abspath(filename))
+        for patch in data.get("patches", []):
+            for sample in patch.get("samples", []):
+                low, high, note = pitchvariants.get_range(sample)
+                for name in samplelayers.get_all_files(sample):
+                    path = os.path.join(root, name.lstrip("/"))
+                    for offset in range(low - note, high - note + 1):
+                        if offset == 0:
+                            continue
+                        variant = pitchvariants.get_path(path, offset)
+                        job = (path, variant, offset)
+                        if job in jobs:
+                            continue
+                        if not force and os.path.exists(variant) and os.path.exists(path) and os.path.getmtime(variant) >= os.path.getmtime(path):
+                            continue
+                        jobs.append(job)
+    return jobs
+
+def render(job):
+    """Worker process entry, returns (variant, bytes, status)."""
+    path, variant, offset, dry_run = job
+    try:
+        data, rate, width = condition.read(path)
+        # Played faster by the pitch ratio, the same length change as a sampler
+        data = condition.resample(data, rate * 2 ** (offset / 12), rate)
+    except (OSError, EOFError, ValueError, wave.Error) as error:
+        return variant, 0, "error: {}".format(error)
+    if not dry_run:
+        condition.write(variant, data, rate)
+    return variant, 44 + len(data) * data.shape[1] * condition.AUDIO_BITS // 8, "{:+d} semitones".format(offset)
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the pitch variants of samples with a note range.")
+    parser.add_argument("configs", nargs="*", default=[os.path.join(hostenv.ROOT_DIR, "config.json")], help="config files")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("--force", action="store_true", help="render every variant, even when up to date")
+    parser.add_argument("--dry-run", action="store_true", help="report without writing any files")
+    args = parser.parse_args()
+
+    jobs = [job + (args.dry_run,) for job in get_jobs(args.configs, args.force)]
+    total = 0
+    with multiprocessing.Pool(max(1, args.jobs)) as pool:
+        for variant, size, status in pool.imap_unordered(render, jobs):
+            total += size
+            name = os.path.relpath(variant)
+            print("{}: {} ({} bytes)".format(variant if name.startswith("..") else name, status, size))
+
+    print("Variants: {} rendered, {} bytes".format(len(jobs), total))
+
+if __name__ == "__main__":
+    main()
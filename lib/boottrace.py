@@ -0,0 +1,64 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: boottrace.py
+Title: Boot Trace
+Version: 0.1.0
+Since: 0.1.0
+
+Time taken by each phase of boot. time.monotonic counts from reset on
+CircuitPython, so the trace also shows how long the board took to reach
+code.py and when the first note could be played. Phases marked after
+that are work deferred until the main loop is running.
+"""
+
+import time
+
+class BootTrace:
+
+    def __init__(self):
+        self._start = time.monotonic_ns()
+        self._last = self._start
+        self._phases = []
+        self._deferred = []
+        self.ready = None
+
+    # Properties
+    def get_start(self):
+        """Milliseconds from reset to the start of code.py."""
+        return self._start / 1000000
+    def get_elapsed(self):
+        return (time.monotonic_ns() - self._start) / 1000000
+    def get_phases(self):
+        return self._phases
+
+    # Methods
+    def mark(self, name):
+        """End the current phase, returns its duration in ms."""
+        now = time.monotonic_ns()
+        duration = (now - self._last) / 1000000
+        if self.ready == None:
+            self._phases.append((name, duration))
+        else:
+            self._deferred.append((name, duration))
+        self._last = now
+        return duration
+
+    def mark_ready(self):
+        """Notes can be played from here on, returns the ms since the start of code.py."""
+        self._last = time.monotonic_ns()
+        self.ready = (self._last - self._start) / 1000000
+        return self.ready
+
+    def get_summary(self):
+        ready = self.ready if self.ready != None else self.get_elapsed()
+        summary = "Boot: {}, ready {:.1f}ms ({:.1f}ms after reset)".format(
+            ", ".join(["{} {:.1f}ms".format(name, duration) for name, duration in self._phases]),
+            ready,
+            self.get_start() + ready
+        )
+        if self._deferred:
+            summary += ", deferred {}".format(", ".join(["{} {:.1f}ms".format(name, duration) for name, duration in self._deferred]))
+        return summary
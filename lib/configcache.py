@@ -0,0 +1,147 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: configcache.py
+Title: Compiled Config Cache
+Version: 0.1.0
+Since: 0.1.0
+
+Compact binary snapshot of a parsed JSON config, written next to the source
+file and reused while the source's size and modification time still match.
+"""
+
+import os
+import struct
+
+CACHE_EXTENSION = ".bin"
+CACHE_MAGIC = b"RPDC"
+CACHE_VERSION = 2
+
+TYPE_NONE = 0
+TYPE_TRUE = 1
+TYPE_FALSE = 2
+TYPE_INT = 3
+TYPE_FLOAT = 4
+TYPE_STRING = 5
+TYPE_LIST = 6
+TYPE_DICT = 7
+
+def get_path(filename):
+    return filename + CACHE_EXTENSION
+
+def get_source_stat(filename):
+    stat = os.stat(filename)
+    return (stat[6], int(stat[8])) # size, mtime
+
+def _encode(value, out):
+    if value == None:
+        out.append(TYPE_NONE)
+    elif value is True:
+        out.append(TYPE_TRUE)
+    elif value is False:
+        out.append(TYPE_FALSE)
+    elif isinstance(value, int):
+        out.append(TYPE_INT)
+        out.extend(struct.pack("<i", value))
+    elif isinstance(value, float):
+        out.append(TYPE_FLOAT)
+        out.extend(struct.pack("<f", value))
+    elif isinstance(value, str):
+        data = value.encode("utf-8")
+        out.append(TYPE_STRING)
+        out.extend(struct.pack("<H", len(data)))
+        out.extend(data)
+    elif isinstance(value, list):
+        out.append(TYPE_LIST)
+        out.extend(struct.pack("<H", len(value)))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out.append(TYPE_DICT)
+        out.extend(struct.pack("<H", len(value)))
+        for key, item in value.items():
+            data = key.encode("utf-8")
+            out.extend(struct.pack("<H", len(data)))
+            out.extend(data)
+            _encode(item, out)
+    else:
+        raise ValueError("Unsupported config value")
+
+def _decode(data, offset):
+    kind = data[offset]
+    offset += 1
+    if kind == TYPE_NONE:
+        return None, offset
+    if kind == TYPE_TRUE:
+        return True, offset
+    if kind == TYPE_FALSE:
+        return False, offset
+    if kind == TYPE_INT:
+        return struct.unpack_from("<i", data, offset)[0], offset + 4
+    if kind == TYPE_FLOAT:
+        return struct.unpack_from("<f", data, offset)[0], offset + 4
+    if kind == TYPE_STRING:
+        length = struct.unpack_from("<H", data, offset)[0]
+        offset += 2
+        return str(data[offset:offset + length], "utf-8"), offset + length
+    if kind == TYPE_LIST:
+        count = struct.unpack_from("<H", data, offset)[0]
+        offset += 2
+        value = []
+        for i in range(count):
+            item, offset = _decode(data, offset)
+            value.append(item)
+        return value, offset
+    if kind == TYPE_DICT:
+        count = struct.unpack_from("<H", data, offset)[0]
+        offset += 2
+        value = dict()
+        for i in range(count):
+            length = struct.unpack_from("<H", data, offset)[0]
+            offset += 2
+            key = str(data[offset:offset + length], "utf-8")
+            offset += length
+            value[key], offset = _decode(data, offset)
+        return value, offset
+    raise ValueError("Invalid config cache")
+
+def _header(size, mtime, prefix):
+    prefix = prefix.encode("utf-8")
+    return CACHE_MAGIC + struct.pack("<BIIH", CACHE_VERSION, size, mtime, len(prefix)) + prefix
+
+def load(filename, prefix=""):
+    """Return the cached data of a config file or None if there is no valid cache."""
+    try:
+        size, mtime = get_source_stat(filename)
+        file = open(get_path(filename), "rb")
+    except OSError:
+        return None
+    try:
+        data = file.read()
+    finally:
+        file.close()
+
+    header = _header(size, mtime, prefix)
+    if len(data) <= len(header) or data[0:len(header)] != header:
+        return None
+    try:
+        return _decode(data, len(header))[0]
+    except (ValueError, IndexError):
+        return None
+
+def save(filename, data, prefix=""):
+    """Write the cache of a config file, returns False if storage is read-only."""
+    try:
+        size, mtime = get_source_stat(filename)
+        out = bytearray(_header(size, mtime, prefix))
+        _encode(data, out)
+        file = open(get_path(filename), "wb")
+        try:
+            file.write(out)
+        finally:
+            file.close()
+    except Exception:
+        return False
+    return True
@@ -0,0 +1,155 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: heapbudget.py
+Title: Heap Budget
+Version: 0.1.0
+Since: 0.1.0
+
+Estimates what a patch will cost before any of it is loaded, decides
+whether it fits in the free heap, and keeps watermarks of the free heap
+and the bytes allocated by each pass of the main loop.
+"""
+
+import gc
+
+import waveinfo
+import patchbundle
+
+RESERVE = 16384 # Bytes always left free for the mixer, menu and Midi
+
+# Rough heap cost of each sample (its row of the sample table, handle and
+# index entries) and each opened file, stream buffers come from the
+# preallocated pools and aren't counted
+SAMPLE_BYTES = 512
+SOURCE_BYTES = 768
+
+LOAD_FULL = "full"
+LOAD_STREAM = "stream" # Fits only if nothing is cached in RAM
+LOAD_REFUSE = "refuse"
+
+class Estimate:
+    def __init__(self, samples=0):
+        self.samples = samples
+        self.files = 0
+        self.missing = 0
+        self.data = 0
+        self.cache = 0
+        self.resident = 0 # Bundles are held in RAM whole
+
+    def add_file(self, filename, cache=None):
+        """Read the header of one file of the patch, counting the bytes it would take in the RAM cache."""
+        try:
+            info = waveinfo.read_file(filename)
+        except OSError:
+            info = None
+        if info == None:
+            self.missing += 1
+            return False
+        self.files += 1
+        self.data += info.data_size
+        if cache != None and cache.is_enabled() and not cache.is_cached(filename) and info.bits_per_sample in (8, 16) and info.data_size <= cache.get_budget():
+            self.cache += info.data_size
+        return True
+
+    def add_bundle(self, filename):
+        """Read the index of a patch bundle, which costs its whole PCM block."""
+        try:
+            info = patchbundle.read_file(filename)
+        except (OSError, ValueError):
+            # A corrupt index (bad utf-8 or truncated entries) counts as missing
+            info = None
+        if info == None:
+            self.missing += 1
+            return False
+        self.files += len(info.entries)
+        self.data += info.get_data_size()
+        self.resident += info.get_data_size()
+        return True
+
+    def get_fixed(self):
+        return self.samples * SAMPLE_BYTES + self.files * SOURCE_BYTES + self.resident
+    def get_cache(self, cache=None):
+        # The cache never grows past its budget, anything more replaces older entries
+        if cache == None or not cache.is_enabled():
+            return 0
+        return min(self.cache, max(0, cache.get_budget() - cache.get_used()))
+    def get_total(self, cache=None):
+        return self.get_fixed() + self.get_cache(cache)
+
+class HeapBudget:
+
+    def __init__(self, reserve=RESERVE):
+        self._reserve = reserve
+        self.low = None
+        self.high = None
+        self.reset()
+
+    # Properties
+    def get_reserve(self):
+        return self._reserve
+    def set_reserve(self, value):
+        self._reserve = max(0, value)
+
+    def get_free(self):
+        free = gc.mem_free()
+        if self.low == None or free < self.low:
+            self.low = free
+        if self.high == None or free > self.high:
+            self.high = free
+        return free
+    def get_available(self):
+        return self.get_free() - self._reserve
+
+    # Methods
+    def collect(self, needed=0):
+        """Only collect garbage when less than the needed bytes and the reserve are free, returns the free bytes."""
+        free = self.get_free()
+        if free < needed + self._reserve:
+            gc.collect()
+            free = self.get_free()
+        return free
+
+    def plan(self, estimate, cache=None):
+        fixed = estimate.get_fixed()
+        free = self.collect(estimate.get_total(cache))
+        if fixed + estimate.get_cache(cache) + self._reserve <= free:
+            return LOAD_FULL
+        if fixed + self._reserve <= free:
+            return LOAD_STREAM
+        return LOAD_REFUSE
+
+    def update(self):
+        """Called once per pass of the main loop, a drop in allocated bytes means the collector ran."""
+        allocated = gc.mem_alloc()
+        if self._last != None:
+            if allocated >= self._last:
+                churn = allocated - self._last
+                self.churn += churn
+                if churn > self.max_churn:
+                    self.max_churn = churn
+            else:
+                self.collections += 1
+        self._last = allocated
+        self.passes += 1
+        self.get_free()
+
+    def reset(self):
+        self.passes = 0
+        self.churn = 0
+        self.max_churn = 0
+        self.collections = 0
+        self._last = None
+
+    def get_summary(self):
+        return "Heap: {} free (low {}, high {}), churn {:.1f} bytes/pass (max {}) over {} passes, {} collections".format(
+            gc.mem_free(),
+            self.low,
+            self.high,
+            self.churn / self.passes if self.passes else 0,
+            self.max_churn,
+            self.passes,
+            self.collections
+        )
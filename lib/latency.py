@@ -0,0 +1,94 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: latency.py
+Title: Latency Histogram
+Version: 0.1.0
+Since: 0.1.0
+
+Fixed size histogram of durations in whole milliseconds, as taken with
+adafruit_ticks. All storage is allocated up front and the values stay small
+ints so that recording a value never allocates.
+"""
+
+import array
+
+BUCKET_MS = 1
+BUCKET_COUNT = 64
+
+class LatencyHistogram:
+
+    def __init__(self, bucket_ms=BUCKET_MS, count=BUCKET_COUNT):
+        self._bucket_ms = bucket_ms
+        # The last bucket also holds everything longer than the histogram
+        self._buckets = array.array("I", bytes(4 * count))
+        self._count = 0
+        self._max = 0
+
+    # Properties
+    def get_bucket_ms(self):
+        return self._bucket_ms
+    def get_bucket_count(self):
+        return len(self._buckets)
+    def get_count(self):
+        return self._count
+    def get_max(self):
+        return self._max
+
+    # Methods
+    def record(self, ms):
+        index = ms // self._bucket_ms
+        if index >= len(self._buckets):
+            index = len(self._buckets) - 1
+        elif index < 0:
+            index = 0
+        self._buckets[index] += 1
+        self._count += 1
+        if ms > self._max:
+            self._max = ms
+
+    def reset(self):
+        for i in range(len(self._buckets)):
+            self._buckets[i] = 0
+        self._count = 0
+        self._max = 0
+
+    def get_percentile(self, percent):
+        """Return the longest duration in ms the bucket holding the given percentile can hold (at most the maximum), or None if empty."""
+        if not self._count:
+            return None
+        target = self._count * percent / 100
+        total = 0
+        for i in range(len(self._buckets)):
+            total += self._buckets[i]
+            if total >= target:
+                if i == len(self._buckets) - 1:
+                    return self._max
+                return min((i + 1) * self._bucket_ms - 1, self._max)
+        return self._max
+
+    def get_summary(self):
+        if not self._count:
+            return "No data"
+        return "{} notes, p50 {}ms, p95 {}ms, p99 {}ms, max {}ms".format(
+            self._count,
+            self.get_percentile(50),
+            self.get_percentile(95),
+            self.get_percentile(99),
+            self._max
+        )
+
+    def dump(self):
+        print(self.get_summary())
+        for i in range(len(self._buckets)):
+            if not self._buckets[i]:
+                continue
+            low = i * self._bucket_ms
+            if i == len(self._buckets) - 1:
+                print("{}ms+: {}".format(low, self._buckets[i]))
+            elif self._bucket_ms == 1:
+                print("{}ms: {}".format(low, self._buckets[i]))
+            else:
+                print("{}-{}ms: {}".format(low, low + self._bucket_ms - 1, self._buckets[i]))
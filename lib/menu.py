@@ -10,6 +10,7 @@ Since: 0.1.0
 """
 
 import json
+import time
 
 import displayio
 import adafruit_displayio_ssd1306
@@ -22,16 +23,26 @@ from adafruit_debouncer import Debouncer
 
 SPLASH_PATH = "/splash.bmp"
 MENU_CONFIG = "menu.json"
+REFRESH_FPS = 30
+ACCEL_TIME = 100000000 # Encoder detents closer together than this in ns are accelerated
 
 def release_displays():
     displayio.release_displays()
 
 class Menu:
 
-    def __init__(self, i2c, encoder_pin_a, encoder_pin_b, button_pin, address=0x3c, width=128, height=64):
+    def __init__(self, i2c, encoder_pin_a, encoder_pin_b, button_pin, address=0x3c, width=128, height=64, refresh_fps=REFRESH_FPS):
         display_bus = displayio.I2CDisplay(i2c, device_address=address)
         self.display = adafruit_displayio_ssd1306.SSD1306(display_bus, width=width, height=height)
 
+        # Refreshed explicitly so that a frame is only sent over I2C when something changed
+        self.display.auto_refresh = False
+        self.set_refresh_fps(refresh_fps)
+        self._dirty = False
+        self._last_refresh = 0
+        self._rows = []
+        self.reset_times()
+
         self.buffer = displayio.Group()
         self.display.show(self.buffer)
 
@@ -40,6 +51,8 @@ class Menu:
             pin_b=encoder_pin_b
         )
         self.last_position = self.encoder.position
+        self.last_turn = 0
+        self.pending_item = None
 
         self.button_pin = DigitalInOut(button_pin)
         self.button_pin.direction = Direction.INPUT
@@ -62,6 +75,7 @@ class Menu:
             pixel_shader=bitmap.pixel_shader
         )
         self.buffer.append(tile_grid)
+        self.refresh(True)
 
         return True
 
@@ -72,6 +86,7 @@ class Menu:
             self.buffer.append(self.splash_text)
 
         self.splash_text.text = text
+        self.refresh(True)
         return True
 
     def _create_group(self, data, callback=None, parent=None):
@@ -109,6 +124,16 @@ class Menu:
                     item.set_value(item_data["value"])
                 if callback != None:
                     item.set_callback(callback)
+            elif item_data["type"] == "action":
+                item = MenuAction(item_data["key"], item_data["name"])
+                if callback != None:
+                    item.set_callback(callback)
+
+            if isinstance(item, MenuValue) and item.get_type() != "string":
+                if "settle" in item_data:
+                    item.set_settle(item_data["settle"])
+                if "accel" in item_data:
+                    item.set_accel(item_data["accel"])
 
             if item != None:
                 group.append(item)
@@ -156,6 +181,7 @@ class Menu:
             draw_item.x = -self.display.width
             self.draw_items.append(draw_item)
         self.buffer.append(self.draw_items)
+        self._rows = [None for i in range(len(self.draw_items))]
 
         # Draw frame
         self.draw()
@@ -166,24 +192,33 @@ class Menu:
         position = self.encoder.position
         if position != self.last_position and hasattr(self, "current_group"): # Encoder turn
             redraw = True
-            if position > self.last_position:
+            if hasattr(self, "current_item") and self.current_item != None:
+                amount = self._get_amount(self.current_item, abs(position - self.last_position))
+                if position > self.last_position:
+                    self.current_item.increment(amount)
+                else:
+                    self.current_item.decrement(amount)
+                if self.current_item.is_pending():
+                    self.pending_item = self.current_item
+            elif position > self.last_position:
                 for i in range(position - self.last_position):
-                    if hasattr(self, "current_item") and self.current_item != None:
-                        self.current_item.increment()
-                    else:
-                        self.current_group.next()
+                    self.current_group.next()
             else:
                 for i in range(self.last_position - position):
-                    if hasattr(self, "current_item") and self.current_item != None:
-                        self.current_item.decrement()
-                    else:
-                        self.current_group.previous()
+                    self.current_group.previous()
         self.last_position = position
 
+        # Settled values apply their callback once the encoder has been idle
+        if self.pending_item != None and self.pending_item.update():
+            self.pending_item = None
+
         self.button.update()
         # Press: self.button.fell
         if self.button.rose and hasattr(self, "current_group"): # Release
             if self.current_item != None:
+                self.current_item.apply()
+                if self.pending_item == self.current_item:
+                    self.pending_item = None
                 self.current_item = None
                 redraw = True
             else:
@@ -197,17 +232,56 @@ class Menu:
                         self.current_group = item.get_parent()
                         self.current_item = None
                         redraw = True
+                elif item.get_type() == "action":
+                    item.trigger()
                 elif item.get_type() != "string":
                     self.current_item = item
                     redraw = True
 
         if redraw:
             self.draw()
+        self.refresh()
+
+    def _get_amount(self, item, steps):
+        # Spinning quickly multiplies each detent, up to the acceleration of the item
+        now = time.monotonic_ns()
+        interval = now - self.last_turn
+        self.last_turn = now
+        accel = item.get_accel()
+        if accel <= 1 or interval >= ACCEL_TIME:
+            return steps
+        return steps * (1 + int((accel - 1) * (ACCEL_TIME - interval) / ACCEL_TIME))
+
+    # Display refresh
+    def set_refresh_fps(self, fps):
+        self._refresh_period = int(1000000000 / fps) if fps > 0 else 0
+    def reset_times(self):
+        self.render_time = 0
+        self.max_render_time = 0
+        self.refresh_time = 0
+        self.max_refresh_time = 0
+        self.refreshes = 0
+
+    def refresh(self, force=False):
+        """Send the frame to the display if it changed, no more than the refresh rate allows unless forced."""
+        if not self._dirty and not force:
+            return False
+        start = time.monotonic_ns()
+        if not force and start - self._last_refresh < self._refresh_period:
+            return False
+        self.display.refresh(target_frames_per_second=None)
+        self._last_refresh = time.monotonic_ns()
+        self._dirty = False
+        self.refreshes += 1
+        self.refresh_time = self._last_refresh - start
+        self.max_refresh_time = max(self.max_refresh_time, self.refresh_time)
+        return True
 
     def draw(self):
         if not hasattr(self, "current_group") or not hasattr(self, "draw_items"):
             return
 
+        start = time.monotonic_ns()
         index = self.current_group.get_selected_index()
 
         if index > 0:
@@ -225,44 +299,56 @@ class Menu:
         else:
             self.draw_item(2, False)
 
+        self.render_time = time.monotonic_ns() - start
+        self.max_render_time = max(self.max_render_time, self.render_time)
+
     def draw_item(self, index, item=False, selected=False):
         if index < 0 or index >= len(self.draw_items):
             return False
 
-        if selected:
-            self.draw_items[index][1].pixel_shader[0] = 0xFFFFFF
-            self.draw_items[index][2].color = 0x000000
-            self.draw_items[index][3].color = 0x000000
-        else:
-            self.draw_items[index][1].pixel_shader[0] = 0x000000
-            self.draw_items[index][2].color = 0xFFFFFF
-            self.draw_items[index][3].color = 0xFFFFFF
-
         if item == False:
-            self._draw_item(index, False)
+            return self._draw_item(index, False)
         elif item.get_type() == "group":
-            self._draw_item(index, True, item.get_name(), ">")
+            return self._draw_item(index, True, item.get_name(), ">", selected)
         elif item.get_type() == "return":
-            self._draw_item(index, True, item.get_name(), "<")
+            return self._draw_item(index, True, item.get_name(), "<", selected)
         elif item.get_type() == "selector":
-            self._draw_item(index, True, item.get_name(), str(item.get_value()))
+            return self._draw_item(index, True, item.get_name(), str(item.get_value()), selected)
         elif not hasattr(item, "get") or item.get() == None:
-            self._draw_item(index, True, item.get_name())
+            return self._draw_item(index, True, item.get_name(), "", selected)
         else:
-            self._draw_item(index, True, item.get_name(), str(item.get()))
+            return self._draw_item(index, True, item.get_name(), str(item.get()), selected)
 
-    def _draw_item(self, index, visible=True, name="", value=""):
+    def _draw_item(self, index, visible=True, name="", value="", selected=False):
         if index < 0 or index >= len(self.draw_items):
             return False
 
+        # Only touch the parts of the row which differ from what was last drawn
+        last = self._rows[index]
+        if last != None and last[0] == visible and (not visible or (last[1] == selected and last[2] == name and last[3] == value)):
+            return False
+        draw_item = self.draw_items[index]
+
+        if last == None or last[0] != visible:
+            draw_item.x = 0 if visible else -self.display.width
+
         if visible:
-            self.draw_items[index].x = 0
+            if last == None or last[1] != selected:
+                draw_item[1].pixel_shader[0] = 0xFFFFFF if selected else 0x000000
+                draw_item[2].color = 0x000000 if selected else 0xFFFFFF
+                draw_item[3].color = 0x000000 if selected else 0xFFFFFF
+            if last == None or last[2] != name:
+                draw_item[2].text = name
+            if last == None or last[3] != value:
+                draw_item[3].text = value
+            self._rows[index] = (visible, selected, name, value)
+        elif last == None:
+            self._rows[index] = (visible, None, None, None)
         else:
-            self.draw_items[index].x = -self.display.width
-
-        self.draw_items[index][2].text = name
-        self.draw_items[index][3].text = value
+            # Hidden rows keep their old contents off screen
+            self._rows[index] = (visible, last[1], last[2], last[3])
 
+        self._dirty = True
         return True
 
     def find_item(self, key, group=None):
@@ -325,6 +411,7 @@ class MenuGroup(MenuItem):
 
     # Iteration
     def __iter__(self):
+        self._index = 0
         return self
     def __next__(self):
         if self._index < len(self._items):
@@ -366,11 +453,25 @@ class MenuReturn(MenuItem):
     def get_parent(self):
         return self._parent
 
+class MenuAction(MenuItem):
+    def __init__(self, key="", name=""):
+        super().__init__("action", key, name)
+        self._callback = None
+    def set_callback(self, cb):
+        self._callback = cb
+    def trigger(self):
+        if self._callback != None:
+            self._callback(self)
+
 class MenuValue(MenuItem):
     def __init__(self, type="", key="", name=""):
         super().__init__(type, key, name)
         self._value = None
         self._callback = None
+        self._settle = 0
+        self._accel = 1
+        self._pending = False
+        self._changed = 0
     def get_key(self):
         return self._key
     def get_name(self):
@@ -382,15 +483,42 @@ class MenuValue(MenuItem):
         self._do_callback()
         return True
     def _do_callback(self):
-        if self._callback != None:
+        if self._settle > 0:
+            # Deferred until the value stops changing
+            self._pending = True
+            self._changed = time.monotonic_ns()
+        elif self._callback != None:
             self._callback(self)
     def set_callback(self, cb):
         self._callback = cb
     def clear_callback(self):
         self._callback = None
-    def increment(self):
+    def get_settle(self):
+        return self._settle / 1000000000
+    def set_settle(self, seconds):
+        self._settle = int(seconds * 1000000000)
+    def get_accel(self):
+        return self._accel
+    def set_accel(self, value):
+        self._accel = max(1, int(value))
+    def is_pending(self):
+        return self._pending
+    def update(self):
+        """Apply a deferred callback once the settle time has passed, returns True when nothing is left pending."""
+        if not self._pending:
+            return True
+        if time.monotonic_ns() - self._changed < self._settle:
+            return False
+        return self.apply()
+    def apply(self):
+        if self._pending:
+            self._pending = False
+            if self._callback != None:
+                self._callback(self)
+        return True
+    def increment(self, amount=1):
         pass
-    def decrement(self):
+    def decrement(self, amount=1):
         pass
 
 class MenuValueString(MenuValue):
@@ -402,10 +530,10 @@ class MenuValueBool(MenuValue):
     def __init__(self, key="", name="", value=False):
         super().__init__("bool", key, name)
         self.set(value)
-    def increment(self):
+    def increment(self, amount=1):
         if not self._value:
             self.set(True)
-    def decrement(self):
+    def decrement(self, amount=1):
         if self._value:
             self.set(False)
 
@@ -423,10 +551,17 @@ class MenuValueNumber(MenuValue):
         self._value = value
         self._do_callback()
         return True
-    def increment(self):
-        return self.set(self._value + 1)
-    def decrement(self):
-        return self.set(self._value - 1)
+    def increment(self, amount=1):
+        return self.set(self._clamp(self._value + amount))
+    def decrement(self, amount=1):
+        return self.set(self._clamp(self._value - amount))
+    def _clamp(self, value):
+        # Accelerated steps stop at the limits rather than being ignored
+        if self._min != None and value < self._min and self._value > self._min:
+            return self._min
+        if self._max != None and value > self._max and self._value < self._max:
+            return self._max
+        return value
     def set_min(self, value):
         self._min = value
     def set_max(self, value):
@@ -456,7 +591,3 @@ class MenuValueSelector(MenuValueNumber):
     def set_items(self, items):
         self._items = items
         self.set_max(len(items) - 1)
-    def increment(self):
-        return self.set(self._value + 1)
-    def decrement(self):
-        return self.set(self._value - 1)
@@ -0,0 +1,131 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: midiin.py
+Title: Midi Input
+Version: 0.1.0
+Since: 0.1.0
+"""
+
+from adafruit_ticks import ticks_ms
+
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+POLY_PRESSURE = 0xA0
+CONTROL_CHANGE = 0xB0
+PROGRAM_CHANGE = 0xC0
+CHANNEL_PRESSURE = 0xD0
+PITCH_BEND = 0xE0
+
+BUFFER_SIZE = 64
+
+class MidiIn:
+
+    def __init__(self, uart, channel=None, thru=False, buffer_size=BUFFER_SIZE, timestamps=False):
+        self._uart = uart
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer) # Partial reads are echoed without copying them
+
+        self.channel = channel # 0-15 or None for omni
+        self.thru = thru
+
+        # Tick in ms the UART was last seen empty, so the current bytes arrived after it. Latency
+        # measured from it is an upper bound which includes the time bytes wait while other tasks run.
+        self.timestamps = timestamps
+        self.timestamp = 0
+        self._empty = -1 # Not seen empty yet, bytes are then timed from when they're read
+
+        # Parser state is kept between reads so messages may span several
+        self._status = 0
+        self._length = 0
+        self._data = 0
+        self._count = 0
+
+        self._note_on = None
+        self._note_off = None
+        self._control_change = None
+        self._program_change = None
+
+    # Callbacks receive plain ints: (note, velocity), (note, velocity), (control, value) and (program)
+    def set_callbacks(self, note_on=None, note_off=None, control_change=None, program_change=None):
+        self._note_on = note_on
+        self._note_off = note_off
+        self._control_change = control_change
+        self._program_change = program_change
+
+    def reset(self):
+        self._status = 0
+        self._count = 0
+
+    def poll(self):
+        if not self._uart.in_waiting:
+            if self.timestamps:
+                self._empty = ticks_ms()
+            return 0
+        count = self._uart.readinto(self._buffer)
+        if not count:
+            return 0
+        if self.timestamps:
+            self.timestamp = self._empty if self._empty >= 0 else ticks_ms()
+
+        if self.thru:
+            self._uart.write(self._buffer if count == len(self._buffer) else self._view[:count])
+
+        buffer = self._buffer
+        status = self._status
+        length = self._length
+        data = self._data
+        received = self._count
+        channel = self.channel
+
+        for i in range(count):
+            byte = buffer[i]
+            if byte >= 0xF8:
+                # Real-time messages may appear anywhere and don't affect running status
+                continue
+            if byte >= 0xF0:
+                # System exclusive and common messages cancel running status
+                status = 0
+                received = 0
+                continue
+            if byte & 0x80:
+                received = 0
+                if channel != None and byte & 0x0F != channel:
+                    status = 0
+                    continue
+                status = byte
+                length = 1 if status & 0xE0 == 0xC0 else 2
+                continue
+            if not status:
+                continue
+            if length == 2 and not received:
+                data = byte
+                received = 1
+                continue
+
+            # Message complete, running status allows the next one to omit the status byte
+            received = 0
+            kind = status & 0xF0
+            if kind == NOTE_ON:
+                if byte:
+                    if self._note_on != None:
+                        self._note_on(data, byte)
+                elif self._note_off != None:
+                    self._note_off(data, 0)
+            elif kind == NOTE_OFF:
+                if self._note_off != None:
+                    self._note_off(data, byte)
+            elif kind == CONTROL_CHANGE:
+                if self._control_change != None:
+                    self._control_change(data, byte)
+            elif kind == PROGRAM_CHANGE:
+                if self._program_change != None:
+                    self._program_change(byte)
+
+        self._status = status
+        self._length = length
+        self._data = data
+        self._count = received
+        return count
@@ -0,0 +1,176 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: patchbundle.py
+Title: Patch Bundle
+Version: 0.1.0
+Since: 0.1.0
+
+Every file of a patch packed into one, built by host/bundle.py. An index
+at the start names each file and where its 16 bit PCM sits, and the PCM
+follows in one block. The device reads the block with a single call and
+plays each file from a slice of it, so a patch takes one open and one
+read however many samples it has.
+
+    header  "<4sHHI"  magic, version, entry count, offset of the PCM block
+    entry   "<IIIBBH" offset in the block, bytes, sample rate, channels, bits, name length
+            followed by the name, utf-8
+"""
+
+import struct
+from audiocore import RawSample
+
+import waveinfo
+
+MAGIC = b"PDRB"
+VERSION = 1
+
+HEADER = "<4sHHI"
+HEADER_SIZE = struct.calcsize(HEADER)
+ENTRY = "<IIIBBH"
+ENTRY_SIZE = struct.calcsize(ENTRY)
+
+BLOCK_ALIGN = 512 # The PCM block starts on a FAT sector
+ALIGN = 4 # Each file starts on a word within the block
+
+class BundleEntry:
+    def __init__(self, name, offset=0, size=0, sample_rate=22050, channel_count=1, bits_per_sample=16):
+        self.name = name
+        self.offset = offset
+        self.size = size
+        self.sample_rate = sample_rate
+        self.channel_count = channel_count
+        self.bits_per_sample = bits_per_sample
+
+class BundleInfo:
+    def __init__(self, data_offset=0, entries=None):
+        self.data_offset = data_offset
+        self.entries = entries if entries != None else []
+
+    def get_data_size(self):
+        size = 0
+        for entry in self.entries:
+            size = max(size, entry.offset + entry.size)
+        return size
+
+def align(value, size=ALIGN):
+    return (value + size - 1) // size * size
+
+def read(file):
+    """Parse the index of an open bundle, returns None if it isn't one."""
+    file.seek(0)
+    header = file.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        return None
+    magic, version, count, data_offset = struct.unpack(HEADER, header)
+    if magic != MAGIC or version != VERSION or data_offset < HEADER_SIZE:
+        return None
+
+    # The whole index is read at once
+    index = file.read(data_offset - HEADER_SIZE)
+    info = BundleInfo(data_offset)
+    position = 0
+    for i in range(count):
+        if position + ENTRY_SIZE > len(index):
+            return None
+        offset, size, sample_rate, channel_count, bits_per_sample, length = struct.unpack_from(ENTRY, index, position)
+        position += ENTRY_SIZE
+        if position + length > len(index):
+            return None
+        try:
+            name = str(index[position:position + length], "utf-8")
+        except UnicodeError:
+            return None
+        position += length
+        info.entries.append(BundleEntry(name, offset, size, sample_rate, channel_count, bits_per_sample))
+    return info
+
+def read_file(filename):
+    file = open(filename, "rb")
+    try:
+        return read(file)
+    finally:
+        file.close()
+
+def write(file, entries):
+    """Write a bundle of (name, pcm, sample_rate, channel_count) entries, pcm being 16 bit signed little endian bytes."""
+    names = [name.encode("utf-8") for name, pcm, sample_rate, channel_count in entries]
+    data_offset = align(HEADER_SIZE + sum([ENTRY_SIZE + len(name) for name in names]), BLOCK_ALIGN)
+
+    file.write(struct.pack(HEADER, MAGIC, VERSION, len(entries), data_offset))
+    offset = 0
+    for i in range(len(entries)):
+        name, pcm, sample_rate, channel_count = entries[i]
+        file.write(struct.pack(ENTRY, offset, len(pcm), sample_rate, channel_count, 16, len(names[i])))
+        file.write(names[i])
+        offset = align(offset + len(pcm))
+
+    file.write(bytes(data_offset - file.tell()))
+    for name, pcm, sample_rate, channel_count in entries:
+        file.write(pcm)
+        file.write(bytes(align(len(pcm)) - len(pcm)))
+
+class PatchBundle:
+
+    def __init__(self, filename=None, prefix=""):
+        self._buffer = None
+        self._entries = dict()
+        self._samples = dict()
+        self._size = 0
+        if filename != None:
+            self.load(filename, prefix)
+
+    # Properties
+    def get_count(self):
+        return len(self._entries)
+    def get_size(self):
+        return self._size
+    def has(self, name):
+        return name in self._entries
+
+    # Methods
+    def load(self, filename, prefix=""):
+        """Read the index and every file of the bundle, names are looked up with the prefix added.
+
+        Raises OSError or ValueError if the file isn't a bundle and MemoryError if it doesn't fit.
+        """
+        self.deinit()
+        file = open(filename, "rb")
+        try:
+            info = read(file)
+            if info == None:
+                raise ValueError("Invalid bundle: " + filename)
+            self._size = info.get_data_size()
+            buffer = waveinfo.new_buffer(self._size)
+            file.seek(info.data_offset)
+            file.readinto(buffer)
+        finally:
+            file.close()
+        self._buffer = buffer
+        for entry in info.entries:
+            self._entries[prefix + entry.name] = entry
+
+    def get(self, name):
+        """Return a RawSample playing from a slice of the bundle, None if the file isn't in it."""
+        if name in self._samples:
+            return self._samples[name]
+        if not name in self._entries:
+            return None
+        entry = self._entries[name]
+        view = memoryview(self._buffer)[entry.offset // 2:(entry.offset + entry.size) // 2]
+        sample = RawSample(view, channel_count=entry.channel_count, sample_rate=entry.sample_rate)
+        self._samples[name] = sample
+        return sample
+
+    def deinit(self):
+        for sample in self._samples.values():
+            sample.deinit()
+        self._samples = dict()
+        self._entries = dict()
+        self._buffer = None
+        self._size = 0
+
+    def get_summary(self):
+        return "{} files, {} bytes".format(len(self._entries), self._size)
@@ -0,0 +1,125 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: patchindex.py
+Title: Patch Index
+Version: 0.1.0
+Since: 0.1.0
+
+Locates each patch within the "patches" array of a JSON config without
+parsing the whole file, so that patches can be read one at a time.
+"""
+
+import gc
+import json
+
+PATCHES_KEY = b"patches"
+CHUNK_SIZE = 512
+
+QUOTE = 0x22
+BACKSLASH = 0x5C
+OPEN_BRACE = 0x7B
+CLOSE_BRACE = 0x7D
+OPEN_BRACKET = 0x5B
+CLOSE_BRACKET = 0x5D
+
+# Index entry fields
+ENTRY_NAME = 0
+ENTRY_PROGRAM = 1
+ENTRY_OFFSET = 2
+ENTRY_LENGTH = 3
+
+def scan(filename):
+    """Return the config without its patches as text and the (offset, length) of every patch."""
+    file = open(filename, "rb")
+
+    settings = bytearray()
+    spans = []
+
+    depth = 0
+    in_string = False
+    escape = False
+    key = bytearray()
+    last_key = None
+    in_patches = False
+    patch_start = 0
+    position = 0
+
+    chunk = bytearray(CHUNK_SIZE)
+    while True:
+        count = file.readinto(chunk)
+        if not count:
+            break
+        for i in range(count):
+            byte = chunk[i]
+            offset = position + i
+
+            if in_string:
+                if escape:
+                    escape = False
+                elif byte == BACKSLASH:
+                    escape = True
+                elif byte == QUOTE:
+                    in_string = False
+                    if depth == 1:
+                        last_key = bytes(key)
+                elif depth == 1:
+                    key.append(byte)
+            elif byte == QUOTE:
+                in_string = True
+                if depth == 1:
+                    key = bytearray()
+            elif byte == OPEN_BRACE or byte == OPEN_BRACKET:
+                depth += 1
+                if depth == 2 and byte == OPEN_BRACKET and last_key == PATCHES_KEY:
+                    in_patches = True
+                    settings.append(byte)
+                elif in_patches and depth == 3:
+                    patch_start = offset
+            elif byte == CLOSE_BRACE or byte == CLOSE_BRACKET:
+                depth -= 1
+                if in_patches and depth == 2:
+                    spans.append((patch_start, offset + 1 - patch_start))
+                elif in_patches and depth == 1:
+                    in_patches = False
+
+            if not in_patches:
+                settings.append(byte)
+        position += count
+
+    file.close()
+    return str(settings, "utf-8"), spans
+
+def read(filename, offset, length):
+    file = open(filename, "rb")
+    try:
+        file.seek(offset)
+        data = json.loads(str(file.read(length), "utf-8"))
+    finally:
+        file.close()
+    return data
+
+def build(filename):
+    """Parse the settings of a config file and index its patches as [name, program, offset, length]."""
+    text, spans = scan(filename)
+    data = json.loads(text)
+    del text
+    gc.collect()
+
+    entries = []
+    for i in range(len(spans)):
+        # Only one patch is held in memory at a time
+        patch = read(filename, spans[i][0], spans[i][1])
+        entries.append([
+            patch["name"] if "name" in patch else str(i),
+            patch["program"] if "program" in patch else None,
+            spans[i][0],
+            spans[i][1]
+        ])
+        del patch
+        gc.collect()
+
+    data["patches"] = entries
+    return data
@@ -0,0 +1,37 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: pitchvariants.py
+Title: Pitch Variants
+Version: 0.1.0
+Since: 0.1.0
+
+Naming of the pitched copies of a sample which host/variants.py renders
+for each note of a sample's "range". A copy sits next to the original
+with the offset in semitones from the root note before the extension,
+"p" for up and "m" for down: tom.wav played 3 semitones up is tom.p3.wav.
+"""
+
+MAX_OFFSET = 48
+
+def get_range(data):
+    """Return (low, high, root) of sample data, a sample without a "range" only covers its note."""
+    note = data["note"] if "note" in data else 0
+    root = data["root"] if "root" in data else note
+    if not "range" in data or len(data["range"]) != 2:
+        return note, note, root
+    low = max(0, min(127, data["range"][0]))
+    high = max(low, min(127, data["range"][1]))
+    low = max(low, root - MAX_OFFSET)
+    high = min(high, root + MAX_OFFSET)
+    return low, high, root
+
+def get_path(path, offset):
+    if offset == 0:
+        return path
+    dot = path.rfind(".")
+    if dot < 0 or "/" in path[dot:]:
+        dot = len(path)
+    return "{}.{}{}{}".format(path[:dot], "p" if offset > 0 else "m", abs(offset), path[dot:])
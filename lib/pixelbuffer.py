@@ -0,0 +1,106 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: pixelbuffer.py
+Title: NeoTrellis Pixel Buffer
+Version: 0.1.0
+Since: 0.1.0
+
+Frame buffer for the NeoPixels of a NeoTrellis. Colors are staged in RAM and
+only the span of pixels that changed is sent to the seesaw, in as few I2C
+writes as the seesaw's buffer allows, followed by a single show command.
+"""
+
+import time
+
+# Seesaw NeoPixel registers
+NEOPIXEL_BASE = 0x0E
+NEOPIXEL_BUF = 0x04
+
+SEESAW_BUFFER = 32 # Bytes per I2C write, including the 2 byte offset
+PIXEL_ORDER = (1, 0, 2) # GRB
+BPP = 3
+
+class PixelBuffer:
+
+    def __init__(self, trellis, count=16, fps=60):
+        self._trellis = trellis
+        self._count = count
+        self.set_fps(fps)
+        self._data = bytearray(count * BPP)
+        self._colors = [None for i in range(count)]
+        self._dirty_start = count
+        self._dirty_end = 0
+        self._last = 0
+        self.flushes = 0
+
+        # Write commands are preallocated for every possible chunk length
+        self._chunk = (SEESAW_BUFFER - 2) // BPP
+        self._commands = [bytearray(2 + i * BPP) for i in range(self._chunk + 1)]
+
+    # Properties
+    def get_count(self):
+        return self._count
+    def set_fps(self, fps):
+        self._period = int(1000000000 / fps) if fps > 0 else 0
+    def is_dirty(self):
+        return self._dirty_start < self._dirty_end
+
+    # Methods
+    def get(self, index):
+        return self._colors[index]
+
+    def set(self, index, color):
+        """Stage a color, returns False if the pixel already shows it."""
+        if self._colors[index] is color:
+            return False
+        self._colors[index] = color
+        offset = index * BPP
+        changed = False
+        for i in range(BPP):
+            value = color[PIXEL_ORDER[i]]
+            if self._data[offset + i] != value:
+                self._data[offset + i] = value
+                changed = True
+        if changed:
+            if index < self._dirty_start:
+                self._dirty_start = index
+            if index + 1 > self._dirty_end:
+                self._dirty_end = index + 1
+        return changed
+
+    def fill(self, color):
+        for i in range(self._count):
+            self.set(i, color)
+
+    def update(self):
+        """Flush pending changes unless the last flush was within the frame period."""
+        if not self.is_dirty():
+            return False
+        now = time.monotonic_ns()
+        if now - self._last < self._period:
+            return False
+        self._last = now
+        return self.flush()
+
+    def flush(self):
+        if not self.is_dirty():
+            return False
+        index = self._dirty_start
+        while index < self._dirty_end:
+            length = min(self._chunk, self._dirty_end - index)
+            command = self._commands[length]
+            offset = index * BPP
+            command[0] = (offset >> 8) & 0xFF
+            command[1] = offset & 0xFF
+            for i in range(length * BPP):
+                command[2 + i] = self._data[offset + i]
+            self._trellis.write(NEOPIXEL_BASE, NEOPIXEL_BUF, command)
+            index += length
+        self._trellis.pixels.show()
+        self._dirty_start = self._count
+        self._dirty_end = 0
+        self.flushes += 1
+        return True
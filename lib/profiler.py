@@ -0,0 +1,102 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: profiler.py
+Title: Main Loop Profiler
+Version: 0.1.0
+Since: 0.1.0
+
+Min, mean and max time of each stage of the main loop and of whole loop
+passes, collected over a rolling window and printed as a single line at the
+end of each window.
+"""
+
+import time
+
+WINDOW = 5.0
+BUDGET = 0.005
+
+class Stage:
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, ns):
+        if not self.count or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        self.total += ns
+        self.count += 1
+
+    def get_mean(self):
+        return self.total // self.count if self.count else 0
+
+    def get_summary(self):
+        if not self.count:
+            return "{} -".format(self.name)
+        return "{} {:.2f}/{:.2f}/{:.2f}".format(self.name, self.min / 1000000, self.get_mean() / 1000000, self.max / 1000000)
+
+class Profiler:
+
+    def __init__(self, window=WINDOW, budget=BUDGET):
+        self._window = int(window * 1000000000)
+        self._budget = int(budget * 1000000000)
+        self._stages = []
+        self.loop = Stage("loop")
+        self.overruns = 0
+        self.windows = 0
+        self._last = None
+        self._start = time.monotonic_ns()
+
+    # Properties
+    def get_window(self):
+        return self._window / 1000000000
+    def get_budget(self):
+        return self._budget / 1000000000
+    def get_stages(self):
+        return self._stages
+
+    # Methods
+    def add(self, name):
+        stage = Stage(name)
+        self._stages.append(stage)
+        return stage
+
+    def record_pass(self, now):
+        """Called once per pass of the main loop with the time it started."""
+        if self._last != None:
+            interval = now - self._last
+            self.loop.record(interval)
+            if interval > self._budget:
+                self.overruns += 1
+        self._last = now
+
+        if now - self._start >= self._window:
+            print(self.get_summary())
+            self.reset(now)
+
+    def reset(self, now=None):
+        self.loop.reset()
+        for stage in self._stages:
+            stage.reset()
+        self.overruns = 0
+        self.windows += 1
+        self._start = now if now != None else time.monotonic_ns()
+
+    def get_summary(self):
+        # min/mean/max in ms, loop overruns are passes longer than the budget
+        return "Profile: {} x{} over {}, {}".format(
+            self.loop.get_summary(),
+            self.loop.count,
+            self.overruns,
+            ", ".join([stage.get_summary() for stage in self._stages])
+        )
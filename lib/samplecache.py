@@ -0,0 +1,150 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: samplecache.py
+Title: Sample Cache
+Version: 0.1.0
+Since: 0.1.0
+"""
+
+import gc
+from audiocore import RawSample
+
+import waveinfo
+
+class CacheEntry:
+    def __init__(self, filename, sample, buffer, size, pinned=False):
+        self.filename = filename
+        self.sample = sample
+        self.buffer = buffer
+        self.size = size
+        self.pinned = pinned
+        self.owners = []
+        self.used = 0
+
+class SampleCache:
+
+    def __init__(self, budget=0, pin_size=0):
+        self._budget = budget
+        self._pin_size = pin_size
+        self._used = 0
+        self._entries = dict()
+        self._counter = 0
+
+    # Properties
+    def get_budget(self):
+        return self._budget
+    def get_used(self):
+        return self._used
+    def get_count(self):
+        return len(self._entries)
+    def is_enabled(self):
+        return self._budget > 0
+    def is_cached(self, filename):
+        return filename in self._entries
+
+    # Methods
+    def load(self, filename, owner=None, pin=None):
+        """Return a RawSample of the file held in RAM or None if it should be streamed instead."""
+        if not self.is_enabled():
+            return None
+
+        if filename in self._entries:
+            entry = self._entries[filename]
+        else:
+            entry = self._read(filename, pin)
+            if entry == None:
+                return None
+            self._entries[filename] = entry
+            self._used += entry.size
+
+        if owner != None and not owner in entry.owners:
+            entry.owners.append(owner)
+        if pin != None:
+            entry.pinned = pin
+        self.touch(filename)
+        return entry.sample
+
+    def touch(self, filename):
+        if filename in self._entries:
+            self._counter += 1
+            self._entries[filename].used = self._counter
+
+    def release(self, filename, owner=None):
+        # Released entries stay cached until space is needed
+        if not filename in self._entries:
+            return
+        entry = self._entries[filename]
+        if owner == None:
+            entry.owners = []
+        elif owner in entry.owners:
+            entry.owners.remove(owner)
+
+    def evict(self, filename):
+        if not filename in self._entries:
+            return False
+        entry = self._entries.pop(filename)
+        self._used -= entry.size
+        for owner in entry.owners:
+            owner.evicted()
+        entry.sample.deinit()
+        del entry
+        return True
+
+    def clear(self):
+        for filename in list(self._entries.keys()):
+            self.evict(filename)
+        gc.collect()
+
+    def _make_room(self, size):
+        if size > self._budget:
+            return False
+        while self._used + size > self._budget:
+            # Least recently used, anything owned and pinned is kept
+            filename = None
+            used = 0
+            for entry in self._entries.values():
+                if entry.pinned and entry.owners:
+                    continue
+                if filename == None or entry.used < used:
+                    filename = entry.filename
+                    used = entry.used
+            if filename == None:
+                return False
+            self.evict(filename)
+        gc.collect()
+        return True
+
+    def _read(self, filename, pin=None):
+        # Missing or unreadable files are left to the caller to stream or skip
+        try:
+            file = open(filename, "rb")
+        except OSError:
+            return None
+        try:
+            info = waveinfo.read(file)
+            if info == None or not info.bits_per_sample in (8, 16) or not info.channel_count:
+                return None
+            # A trailing partial frame (such as an odd byte of 16 bit audio) is dropped
+            size = info.data_size - info.data_size % info.get_frame_size()
+            if not size or not self._make_room(size):
+                return None
+
+            # Decoded PCM is kept in a typed buffer so RawSample knows the sample format
+            buffer = waveinfo.new_buffer(size, info.bits_per_sample)
+            file.seek(info.data_offset)
+            file.readinto(buffer)
+            sample = RawSample(buffer, channel_count=info.channel_count, sample_rate=info.sample_rate)
+        except MemoryError:
+            gc.collect()
+            return None
+        except OSError:
+            return None
+        finally:
+            file.close()
+
+        if pin == None:
+            pin = size <= self._pin_size
+        return CacheEntry(filename, sample, buffer, size, pin)
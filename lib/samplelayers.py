@@ -0,0 +1,101 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: samplelayers.py
+Title: Sample Layers
+Version: 0.1.0
+Since: 0.1.0
+
+Velocity layers of a sample, each with one or more round-robin files. A
+sample is written in the config as either a single "file", a list of
+"files" to alternate between or a list of "layers":
+
+    "layers": [
+        {"velocity": [0, 79], "files": ["/samples/snare-soft1.wav", "/samples/snare-soft2.wav"]},
+        {"velocity": [80, 127], "file": "/samples/snare-hard.wav"}
+    ]
+
+The layer of every velocity is worked out once into a 128 byte table.
+"""
+
+VELOCITY_COUNT = 128
+NO_LAYER = 255
+SINGLE_LAYER = bytes(VELOCITY_COUNT) # Shared table of every sample with only one layer
+
+def get_files(data):
+    """Return the files of a layer or of a sample without layers."""
+    if "files" in data and isinstance(data["files"], list):
+        return [file for file in data["files"] if file]
+    if "file" in data and data["file"]:
+        return [data["file"]]
+    return []
+
+def get_layers(data):
+    """Return the layers of sample data as a list of (low, high, files), layers without files are skipped."""
+    if not "layers" in data:
+        files = get_files(data)
+        return [(0, VELOCITY_COUNT - 1, files)] if files else []
+
+    layers = []
+    for layer in data["layers"]:
+        files = get_files(layer)
+        if not files:
+            continue
+        low, high = 0, VELOCITY_COUNT - 1
+        if "velocity" in layer and len(layer["velocity"]) == 2:
+            low = max(0, min(VELOCITY_COUNT - 1, layer["velocity"][0]))
+            high = max(low, min(VELOCITY_COUNT - 1, layer["velocity"][1]))
+        layers.append((low, high, files))
+        if len(layers) >= NO_LAYER:
+            break
+    return layers
+
+def get_all_files(data):
+    """Return every distinct file of sample data in order."""
+    files = []
+    for low, high, layer_files in get_layers(data):
+        for file in layer_files:
+            if not file in files:
+                files.append(file)
+    return files
+
+def build_table(layers, table=None):
+    """Fill table (or a new bytearray) with the layer index of every velocity.
+
+    Overlapping ranges go to the later layer. Velocities outside of every
+    range use the closest layer below them, or above them if there is none.
+    """
+    if table == None:
+        table = bytearray(VELOCITY_COUNT)
+    for i in range(VELOCITY_COUNT):
+        table[i] = NO_LAYER
+    for index in range(len(layers)):
+        low, high, files = layers[index]
+        for i in range(low, high + 1):
+            table[i] = index
+
+    last = NO_LAYER
+    for i in range(VELOCITY_COUNT):
+        if table[i] == NO_LAYER:
+            table[i] = last
+        else:
+            last = table[i]
+    last = NO_LAYER
+    for i in range(VELOCITY_COUNT - 1, -1, -1):
+        if table[i] == NO_LAYER:
+            table[i] = last
+        else:
+            last = table[i]
+    return table
+
+def add_prefix(data, prefix):
+    """Prepend a folder to every file of sample data in place."""
+    if "file" in data and len(data["file"]) > 0:
+        data["file"] = prefix + data["file"]
+    if "files" in data and isinstance(data["files"], list):
+        data["files"] = [prefix + file if file else file for file in data["files"]]
+    if "layers" in data:
+        for layer in data["layers"]:
+            add_prefix(layer, prefix)
@@ -0,0 +1,125 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: sampletable.py
+Title: Sample Table
+Version: 0.1.0
+Since: 0.1.0
+
+Settings of every sample of a patch, one typed array per setting indexed by
+sample rather than an object per sample. Colors and velocity level tables
+are shared by all samples which use the same ones, so the config data of a
+patch can be dropped once it has loaded.
+"""
+
+import array
+
+import velocitycurve
+
+FLAG_LOOP = 0x01
+FLAG_NOTE_OFF = 0x02 # Stop playing on note off
+
+class SampleTable:
+
+    def __init__(self, size):
+        self._size = size
+        self._count = 0
+
+        self.low = bytearray(size)
+        self.high = bytearray(size)
+        self.root = bytearray(size)
+        self.pad = array.array("b", bytes(size))
+        self.voice = array.array("b", bytes(size)) # Most recently started voice
+        self.max_voices = bytearray(size)
+        self.flags = bytearray(size)
+        self.level = array.array("f", bytes(size * 4))
+        self.min_level = array.array("f", bytes(size * 4))
+        self.pan = array.array("f", bytes(size * 4))
+
+        # Sample => index into the shared palette and level tables
+        self.color = bytearray(size)
+        self.levels = bytearray(size)
+        self._colors = []
+        self._dim_colors = []
+        self._curves = []
+        self._tables = []
+
+    # Properties
+    def get_size(self):
+        return self._size
+    def get_count(self):
+        return self._count
+    def get_color_count(self):
+        return len(self._colors)
+    def get_table_count(self):
+        return len(self._tables)
+    def get_bytes(self):
+        """Bytes of the columns and shared level tables, not counting the objects holding them."""
+        return self._size * 21 + len(self._tables) * velocitycurve.TABLE_SIZE * 4
+
+    def get_color(self, index):
+        return self._colors[self.color[index]]
+    def get_dim_color(self, index):
+        return self._dim_colors[self.color[index]]
+    def get_level(self, index, velocity):
+        return self._tables[self.levels[index]][velocity]
+    def is_loop(self, index):
+        return bool(self.flags[index] & FLAG_LOOP)
+    def is_note_off(self, index):
+        return bool(self.flags[index] & FLAG_NOTE_OFF)
+
+    # Methods
+    def add(self, low, high, root, pad=-1, color=(0, 0, 0), level=1.0, min_level=0.0, curve=velocitycurve.CURVE_LINEAR, volume=1.0, pan=0.0, loop=False, note_off=False, max_voices=1):
+        """Append a sample, returns its index or -1 when the table is full."""
+        if self._count >= self._size:
+            return -1
+        index = self._count
+        self._count += 1
+
+        self.low[index] = low
+        self.high[index] = high
+        self.root[index] = root
+        self.pad[index] = pad
+        self.voice[index] = -1
+        self.max_voices[index] = max_voices
+        self.flags[index] = (FLAG_LOOP if loop else 0) | (FLAG_NOTE_OFF if note_off else 0)
+        self.level[index] = level
+        self.min_level[index] = min_level
+        self.pan[index] = max(-1.0, min(1.0, pan))
+        self.color[index] = self._add_color(color)
+        self.levels[index] = self._add_curve(curve, level, min_level, volume)
+        return index
+
+    def _add_color(self, color):
+        if color in self._colors:
+            return self._colors.index(color)
+        self._colors.append(color)
+        self._dim_colors.append(tuple(int(c/2) for c in color))
+        return len(self._colors) - 1
+
+    def _add_curve(self, curve, level, min_level, volume):
+        key = (curve, level, min_level)
+        if key in self._curves:
+            return self._curves.index(key)
+        if len(self._curves) >= 256:
+            # Out of indexes, the closest thing is the last table
+            return 255
+        self._curves.append(key)
+        self._tables.append(velocitycurve.build_table(curve, level, min_level, volume, array.array("f", bytes(velocitycurve.TABLE_SIZE * 4))))
+        return len(self._tables) - 1
+
+    def update_levels(self, volume):
+        # Every sample sharing a table follows the new master volume at once
+        for i in range(len(self._tables)):
+            curve, level, min_level = self._curves[i]
+            velocitycurve.build_table(curve, level, min_level, volume, self._tables[i])
+
+    def get_summary(self):
+        return "{} samples, {} colors, {} level tables, {} bytes".format(
+            self._count,
+            len(self._colors),
+            len(self._tables),
+            self.get_bytes()
+        )
@@ -0,0 +1,130 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: scheduler.py
+Title: Task Scheduler
+Version: 0.1.0
+Since: 0.1.0
+"""
+
+import time
+import asyncio
+from adafruit_ticks import ticks_ms, ticks_diff
+
+class Task:
+    def __init__(self, name, callback, period=0.0, stage=None, profiler=None, once=False, monitor=False):
+        self.name = name
+        self.callback = callback
+        self.period = period
+        self.monitor = monitor # Time intervals and durations in ns, which allocates a long int on each read
+        self.once = once # Waits out the period and runs a single time
+        self.stage = stage # Profiler stage timing each run
+        self.profiler = profiler # Set on the task which marks each pass of the loop
+        self.reset()
+
+    def reset(self):
+        self.runs = 0
+        self.last = None
+        self.max_interval = 0
+        self.max_duration = 0
+
+    # Properties
+    def get_name(self):
+        return self.name
+    def get_period(self):
+        return self.period
+    def set_period(self, value):
+        self.period = max(0.0, value)
+
+    # Worst case delay in seconds between something arriving just after a run and it being handled
+    def get_worst_latency(self):
+        return (self.max_interval + self.max_duration) / 1000000000
+
+    def measure(self):
+        """Run the callback once recording its interval and duration, returns the seconds it took."""
+        start = time.monotonic_ns()
+        if self.last != None and start - self.last > self.max_interval:
+            self.max_interval = start - self.last
+        self.last = start
+        if self.profiler != None:
+            self.profiler.record_pass(start)
+
+        self.callback()
+        self.runs += 1
+
+        duration = time.monotonic_ns() - start
+        if duration > self.max_duration:
+            self.max_duration = duration
+        if self.stage != None:
+            self.stage.record(duration)
+        return duration / 1000000000
+
+    async def run(self):
+        if self.once:
+            await asyncio.sleep(self.period)
+        while True:
+            if self.monitor:
+                elapsed = self.measure()
+            else:
+                # Millisecond ticks stay small ints, enough to hold the period without allocating
+                start = ticks_ms()
+                self.callback()
+                self.runs += 1
+                elapsed = ticks_diff(ticks_ms(), start) / 1000
+            if self.once:
+                return
+
+            # A period of 0 still yields so that every other task gets a turn
+            delay = self.period - elapsed
+            await asyncio.sleep(delay if delay > 0 else 0)
+
+class Scheduler:
+    def __init__(self, profiler=None, monitor=False):
+        self._tasks = []
+        self._profiler = profiler
+        self._monitor = monitor or profiler != None
+
+    def get_profiler(self):
+        return self._profiler
+
+    def is_monitored(self):
+        return self._monitor
+
+    def add(self, name, callback, period=0.0):
+        task = Task(name, callback, period, monitor=self._monitor)
+        if self._profiler != None:
+            task.stage = self._profiler.add(name)
+            # The first task should run on every pass, so its runs mark the passes of the loop
+            if not self._tasks:
+                task.profiler = self._profiler
+        self._tasks.append(task)
+        return task
+
+    def defer(self, name, callback, delay=0.0):
+        """Run the callback once the loop has been running for the delay in seconds, outside of the profile."""
+        task = Task(name, callback, delay, once=True)
+        self._tasks.append(task)
+        return task
+
+    def get(self, name):
+        for task in self._tasks:
+            if task.name == name:
+                return task
+        return None
+
+    def reset(self):
+        for task in self._tasks:
+            task.reset()
+
+    def __iter__(self):
+        return iter(self._tasks)
+    def __len__(self):
+        return len(self._tasks)
+
+    async def main(self):
+        await asyncio.gather(*[asyncio.create_task(task.run()) for task in self._tasks])
+
+    def run(self):
+        asyncio.run(self.main())
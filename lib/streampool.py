@@ -0,0 +1,127 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: streampool.py
+Title: Stream Pool
+Version: 0.1.0
+Since: 0.1.0
+
+Fixed set of WaveFile streams sharing buffers allocated at boot, one per
+voice. A stream stays open on its file after its voice ends so the next
+hit can reuse it, and is only reopened on another file when every stream
+is taken.
+"""
+
+from audiocore import WaveFile
+
+class Stream:
+    def __init__(self, pool, size):
+        self.pool = pool
+        self.buffer = bytearray(size)
+        self.owner = None
+        self.file = None
+        self.wave = None
+        self.voice = -1
+        self.used = 0
+
+    def is_playing(self):
+        return self.voice >= 0
+
+    def start(self, voice):
+        self.voice = voice
+        self.used = self.pool.tick()
+
+    def stop(self):
+        self.voice = -1
+
+class StreamPool:
+
+    def __init__(self, count, size):
+        self._size = size
+        self._counter = 0
+        self._streams = [Stream(self, size) for i in range(count)]
+
+    # Properties
+    def get_size(self):
+        return self._size
+    def get_count(self):
+        return len(self._streams)
+    def get_bytes(self):
+        return self._size * len(self._streams)
+    def get_open_count(self):
+        count = 0
+        for stream in self._streams:
+            if stream.owner != None:
+                count += 1
+        return count
+    def get_playing_count(self):
+        count = 0
+        for stream in self._streams:
+            if stream.is_playing():
+                count += 1
+        return count
+    def get_used(self):
+        """Bytes of buffer held by playing voices."""
+        return self.get_playing_count() * self._size
+
+    # Methods
+    def tick(self):
+        self._counter += 1
+        return self._counter
+
+    def acquire(self, owner, filename):
+        """Return a stream opened on the file, reusing the least recently played idle stream, or None if all of them are playing.
+
+        Raises OSError or ValueError if the file can't be opened as a wave.
+        """
+        stream = None
+        for item in self._streams:
+            if item.is_playing():
+                continue
+            if item.owner == None:
+                stream = item
+                break
+            if stream == None or item.used < stream.used:
+                stream = item
+        if stream == None:
+            return None
+
+        self.close(stream)
+        file = open(filename, "rb")
+        try:
+            wave = WaveFile(file, stream.buffer)
+        except:
+            file.close()
+            raise
+        stream.owner = owner
+        stream.file = file
+        stream.wave = wave
+        stream.used = self.tick()
+        return stream
+
+    def close(self, stream):
+        if stream.owner == None:
+            return
+        owner = stream.owner
+        stream.owner = None
+        stream.voice = -1
+        stream.wave.deinit()
+        stream.file.close()
+        stream.wave = None
+        stream.file = None
+        owner.reclaimed(stream)
+
+    def clear(self):
+        for stream in self._streams:
+            self.close(stream)
+
+    def get_summary(self):
+        return "{} x {} bytes, {} open, {} playing ({} bytes)".format(
+            len(self._streams),
+            self._size,
+            self.get_open_count(),
+            self.get_playing_count(),
+            self.get_used()
+        )
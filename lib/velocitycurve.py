@@ -0,0 +1,65 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: velocitycurve.py
+Title: Velocity Curves
+Version: 0.1.0
+Since: 0.1.0
+
+Bakes a velocity curve, the level range of a sample and the master volume
+into a 128 entry table so that a note only needs a single lookup.
+"""
+
+import math
+
+CURVE_LINEAR = "linear"
+CURVE_EXPONENTIAL = "exponential"
+CURVE_LOGARITHMIC = "logarithmic"
+
+CURVES = (CURVE_LINEAR, CURVE_EXPONENTIAL, CURVE_LOGARITHMIC)
+CURVE_AMOUNT = 4.0 # Steepness of the exponential and logarithmic curves
+
+TABLE_SIZE = 128
+
+def get_curve(curve, x):
+    """Map x from 0.0 to 1.0 through the curve, either a name or a list of [velocity, value] points."""
+    if isinstance(curve, list):
+        return _interpolate(curve, x * (TABLE_SIZE - 1))
+    if curve == CURVE_EXPONENTIAL:
+        return (math.exp(CURVE_AMOUNT * x) - 1) / (math.exp(CURVE_AMOUNT) - 1)
+    if curve == CURVE_LOGARITHMIC:
+        return math.log(1 + (math.exp(CURVE_AMOUNT) - 1) * x) / CURVE_AMOUNT
+    return x
+
+def _interpolate(points, velocity):
+    if not points:
+        return velocity / (TABLE_SIZE - 1)
+    if velocity <= points[0][0]:
+        return points[0][1]
+    for i in range(1, len(points)):
+        if velocity <= points[i][0]:
+            x0, y0 = points[i - 1][0], points[i - 1][1]
+            x1, y1 = points[i][0], points[i][1]
+            if x1 == x0:
+                return y1
+            return y0 + (y1 - y0) * (velocity - x0) / (x1 - x0)
+    return points[-1][1]
+
+def is_valid(curve):
+    if isinstance(curve, list):
+        for point in curve:
+            if not isinstance(point, list) or len(point) != 2:
+                return False
+        return True
+    return curve in CURVES
+
+def build_table(curve, level=1.0, min_level=0.0, volume=1.0, table=None):
+    """Fill table (or a new list) with the voice level of every velocity."""
+    if table == None:
+        table = [0.0 for i in range(TABLE_SIZE)]
+    for i in range(TABLE_SIZE):
+        value = get_curve(curve, i / (TABLE_SIZE - 1)) * (level - min_level) + min_level
+        table[i] = min(1.0, max(0.0, value) * volume)
+    return table
@@ -0,0 +1,130 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: voicepool.py
+Title: Voice Pool
+Version: 0.1.0
+Since: 0.1.0
+"""
+
+STEAL_NONE = "none"
+STEAL_OLDEST = "oldest"
+STEAL_QUIETEST = "quietest"
+STEAL_SAME = "same"
+
+STEAL_POLICIES = (STEAL_NONE, STEAL_OLDEST, STEAL_QUIETEST, STEAL_SAME)
+
+class VoicePool:
+
+    def __init__(self, voices, count, policy=STEAL_OLDEST, callback=None):
+        self._voices = voices
+        self._count = count
+        self._callback = callback
+
+        # Free voices are kept on a stack, a voice without an owner is always on it
+        self._free = [i for i in reversed(range(count))]
+        self._owners = [None for i in range(count)]
+        self._started = [0 for i in range(count)]
+        self._counter = 0
+
+        self._policy = STEAL_OLDEST
+        self.set_policy(policy)
+
+    # Properties
+    def get_policy(self):
+        return self._policy
+    def set_policy(self, policy):
+        if not policy in STEAL_POLICIES:
+            return False
+        self._policy = policy
+        return True
+    def get_owner(self, voice):
+        if voice < 0 or voice >= self._count:
+            return None
+        return self._owners[voice]
+    def get_started(self, voice):
+        return self._started[voice]
+    def get_free_count(self):
+        return len(self._free)
+    def get_count(self):
+        return self._count
+
+    # Methods
+    def allocate(self, owner):
+        if not self._free:
+            self.reclaim()
+
+        if self._free:
+            voice = self._free.pop()
+        else:
+            voice = self._steal(owner)
+            if voice < 0:
+                return -1
+            self.release(voice)
+            self._free.pop()
+
+        self._owners[voice] = owner
+        self._counter += 1
+        self._started[voice] = self._counter
+        return voice
+
+    def release(self, voice):
+        if voice < 0 or voice >= self._count or self._owners[voice] == None:
+            return False
+
+        if self._voices[voice].playing:
+            self._voices[voice].stop()
+        self._voices[voice].level = 0.0
+        self._voices[voice].pan = 0.0
+
+        owner = self._owners[voice]
+        self._owners[voice] = None
+        self._free.append(voice)
+
+        if self._callback != None:
+            self._callback(voice, owner)
+        return True
+
+    def reclaim(self):
+        count = 0
+        for i in range(self._count):
+            if self._owners[i] != None and not self._voices[i].playing:
+                self.release(i)
+                count += 1
+        return count
+
+    def release_all(self, owner=None):
+        for i in range(self._count):
+            if self._owners[i] != None and (owner == None or self._owners[i] == owner):
+                self.release(i)
+
+    def _steal(self, owner):
+        if self._policy == STEAL_NONE:
+            return -1
+        if self._policy == STEAL_SAME:
+            voice = self._find_oldest(owner)
+            if voice >= 0:
+                return voice
+        elif self._policy == STEAL_QUIETEST:
+            return self._find_quietest()
+        return self._find_oldest()
+
+    def _find_oldest(self, owner=None):
+        voice = -1
+        for i in range(self._count):
+            if owner != None and self._owners[i] != owner:
+                continue
+            if voice < 0 or self._started[i] < self._started[voice]:
+                voice = i
+        return voice
+
+    def _find_quietest(self):
+        voice = -1
+        for i in range(self._count):
+            if voice < 0 or self._voices[i].level < self._voices[voice].level:
+                voice = i
+            elif self._voices[i].level == self._voices[voice].level and self._started[i] < self._started[voice]:
+                voice = i
+        return voice
@@ -0,0 +1,86 @@
+"""
+RPi Pico Drum Machine
+2022 D Cooper Dalrymple - me@dcdalrymple.com
+GPL v2 License
+
+File: waveinfo.py
+Title: Wave File Header
+Version: 0.1.0
+Since: 0.1.0
+"""
+
+import struct
+import array
+
+try:
+    from ulab import numpy
+except ImportError:
+    numpy = None
+
+WAVE_FORMAT_PCM = 1
+
+class WaveInfo:
+    def __init__(self, channel_count=1, sample_rate=22050, bits_per_sample=16, data_offset=0, data_size=0):
+        self.channel_count = channel_count
+        self.sample_rate = sample_rate
+        self.bits_per_sample = bits_per_sample
+        self.data_offset = data_offset
+        self.data_size = data_size
+
+    def get_frame_size(self):
+        return self.channel_count * self.bits_per_sample // 8
+    def get_frames(self):
+        return self.data_size // self.get_frame_size()
+    def get_duration(self):
+        return self.get_frames() / self.sample_rate
+
+def read(file):
+    """Parse the RIFF header of an open wave file, returns None if it isn't PCM audio."""
+    file.seek(0)
+    header = file.read(12)
+    if len(header) < 12 or header[0:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+
+    info = None
+    while True:
+        chunk = file.read(8)
+        if len(chunk) < 8:
+            return None
+        chunk_id = chunk[0:4]
+        chunk_size = struct.unpack("<I", chunk[4:8])[0]
+
+        if chunk_id == b"fmt ":
+            fmt = file.read(chunk_size)
+            format, channel_count, sample_rate, byte_rate, block_align, bits_per_sample = struct.unpack("<HHIIHH", fmt[0:16])
+            if format != WAVE_FORMAT_PCM:
+                return None
+            info = WaveInfo(channel_count, sample_rate, bits_per_sample)
+            if chunk_size & 1:
+                file.read(1)
+        elif chunk_id == b"data":
+            if info == None:
+                return None
+            info.data_offset = file.tell()
+            info.data_size = chunk_size
+            return info
+        else:
+            # Chunks are word aligned
+            file.seek(file.tell() + chunk_size + (chunk_size & 1))
+
+def read_file(filename):
+    file = open(filename, "rb")
+    try:
+        return read(file)
+    finally:
+        file.close()
+
+def new_buffer(size, bits_per_sample=16):
+    """Return a zeroed buffer of size bytes typed for RawSample, 8 bit unsigned or 16 bit signed.
+
+    It is allocated in one piece where possible, array.array has to copy it from a temporary of the same size.
+    """
+    if bits_per_sample == 8:
+        return bytearray(size)
+    if numpy != None:
+        return numpy.zeros(size // 2, dtype=numpy.int16)
+    return array.array("h", bytes(size))
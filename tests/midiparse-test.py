@@ -0,0 +1,146 @@
+# Raspberry Pi Pico (RP2040) MIDI Drum Machine - MIDI Parser Benchmark
+# 2022 DCooper Dalrymple - me@dcdalrymple.com
+# GPL v2 License
+# Version 1.0
+
+import gc
+import time
+import board
+
+from digitalio import DigitalInOut, Direction
+import adafruit_midi
+from adafruit_midi.note_on import NoteOn
+from adafruit_midi.note_off import NoteOff
+from adafruit_midi.program_change import ProgramChange
+from adafruit_midi.control_change import ControlChange
+from midiin import MidiIn
+
+# Program Constants
+
+MIDI_CHANNEL      = 10
+TEST_NOTES        = (36, 38, 42, 46, 49)
+TEST_HITS         = 2000
+TEST_CHUNK        = 16 # Bytes available per UART read
+
+class ReplayUART:
+    def __init__(self, data, chunk=TEST_CHUNK):
+        self._data = data
+        self._chunk = chunk
+        self._position = 0
+    def rewind(self):
+        self._position = 0
+    @property
+    def in_waiting(self):
+        return min(self._chunk, len(self._data) - self._position)
+    def read(self, nbytes=None):
+        count = min(self.in_waiting, nbytes if nbytes != None else self._chunk)
+        if not count:
+            return None
+        data = self._data[self._position:self._position + count]
+        self._position += count
+        return data
+    def readinto(self, buf):
+        count = min(self.in_waiting, len(buf))
+        if not count:
+            return None
+        for i in range(count):
+            buf[i] = self._data[self._position + i]
+        self._position += count
+        return count
+    def write(self, buf):
+        return len(buf)
+
+def build_stream():
+    # Drum fill with note offs as zero velocity note ons, half of them using running status
+    status = 0x90 | (MIDI_CHANNEL - 1)
+    data = bytearray()
+    for i in range(TEST_HITS):
+        note = TEST_NOTES[i % len(TEST_NOTES)]
+        if i % 2 == 0:
+            data.extend(bytes((status, note, 64 + i % 64, note, 0)))
+        else:
+            data.extend(bytes((status, note, 64 + i % 64, status, note, 0)))
+        if i % 100 == 0:
+            data.extend(bytes((0xB0 | (MIDI_CHANNEL - 1), 7, 100, 0xF8)))
+    return bytes(data)
+
+class Counter:
+    def __init__(self):
+        self.notes = 0
+        self.other = 0
+    def note_on(self, note, velocity):
+        self.notes += 1
+    def note_off(self, note, velocity):
+        self.other += 1
+    def control_change(self, control, value):
+        self.other += 1
+    def program_change(self, program):
+        self.other += 1
+
+def measure(name, uart, callback):
+    uart.rewind()
+    gc.collect()
+    gc.disable()
+    alloc = gc.mem_alloc()
+    start = time.monotonic_ns()
+    count = callback()
+    elapsed = time.monotonic_ns() - start
+    alloc = gc.mem_alloc() - alloc
+    gc.enable()
+    print("{}: {} notes, {:.1f}ms, {:.1f}us/note, {} bytes allocated".format(name, count, elapsed / 1000000, elapsed / 1000 / max(1, count), alloc))
+    return elapsed
+
+def run_adafruit_midi(uart):
+    midi = adafruit_midi.MIDI(midi_in=uart, in_channel=MIDI_CHANNEL-1)
+    counter = Counter()
+    def callback():
+        while uart.in_waiting:
+            msg_in = midi.receive()
+            while msg_in != None:
+                if isinstance(msg_in, NoteOn) and msg_in.velocity > 0:
+                    counter.note_on(msg_in.note, msg_in.velocity)
+                elif isinstance(msg_in, NoteOff) or isinstance(msg_in, NoteOn):
+                    counter.note_off(msg_in.note, msg_in.velocity)
+                elif isinstance(msg_in, ControlChange):
+                    counter.control_change(msg_in.control, msg_in.value)
+                elif isinstance(msg_in, ProgramChange):
+                    counter.program_change(msg_in.patch)
+                msg_in = midi.receive()
+        return counter.notes
+    return measure("adafruit_midi", uart, callback)
+
+def run_midiin(uart):
+    midi = MidiIn(uart, channel=MIDI_CHANNEL-1)
+    counter = Counter()
+    midi.set_callbacks(counter.note_on, counter.note_off, counter.control_change, counter.program_change)
+    def callback():
+        while midi.poll():
+            pass
+        return counter.notes
+    return measure("midiin", uart, callback)
+
+# Initialize status LED
+led = DigitalInOut(board.LED)
+led.direction = Direction.OUTPUT
+led.value = True
+
+# Wait for USB to stabilize
+time.sleep(0.5)
+
+# Serial Header
+print("RPi Pico Drum - MIDI Parser Benchmark")
+print("Version 1.0")
+print("Cooper Dalrymple, 2022")
+print("https://dcdalrymple.com/rpi-pico-drum/")
+
+print("\n:: Building Replay Stream ::")
+uart = ReplayUART(build_stream())
+print("Bytes:", len(uart._data))
+
+print("\n:: Replaying ::")
+reference = run_adafruit_midi(uart)
+result = run_midiin(uart)
+print("Speedup: {:.2f}x".format(reference / max(1, result)))
+
+print("\n:: Complete ::")
+led.value = False